@@ -0,0 +1,83 @@
+"""Compares the gateway_compression modes on a replayed READY.
+
+A local gateway sends a READY with four 5000 member servers followed by
+50 MESSAGE_CREATE events, compressed the way each mode asks for. In
+zlib-stream mode the payloads are split into 64 KiB messages. For every
+mode it reports the bytes sent and the time from the READY being sent to
+the last on_message. It also times decoding the READY payload on its own.
+Needs aiohttp. Run it with::
+
+    python benchmarks/gateway_compression.py
+"""
+
+import json
+import time
+import timeit
+import zlib
+
+from synthetic import make_guild, ready, message
+from local_gateway import LocalGateway
+import discord
+
+READY = json.dumps({'op': 0, 's': 1, 't': 'READY',
+                    'd': ready([make_guild(str(100 + index), members=5000) for index in range(4)])})
+EVENTS = [json.dumps({'op': 0, 's': 2 + index, 't': 'MESSAGE_CREATE',
+                      'd': message(10 + index, '100', '10000000', 'message {}'.format(index))})
+          for index in range(50)]
+
+result = {}
+
+async def replay(request, websocket):
+    stream = request.query.get('compress') == 'zlib-stream'
+    identify = json.loads((await websocket.receive()).data)
+    compress = identify['d'].get('compress', False)
+    context = zlib.compressobj()
+
+    sent = 0
+    result['start'] = time.perf_counter()
+    for payload in [READY] + EVENTS:
+        if stream:
+            data = context.compress(payload.encode('utf-8')) + context.flush(zlib.Z_SYNC_FLUSH)
+            for offset in range(0, len(data), 65536):
+                await websocket.send_bytes(data[offset:offset + 65536])
+        elif compress:
+            data = zlib.compress(payload.encode('utf-8'))
+            await websocket.send_bytes(data)
+        else:
+            data = payload.encode('utf-8')
+            await websocket.send_str(payload)
+        sent += len(data)
+    result['bytes'] = sent
+
+    # wait for the client to log out
+    async for _ in websocket:
+        pass
+
+gateway = LocalGateway(replay)
+
+def run(mode):
+    client = discord.Client(gateway_compression=mode)
+    received = []
+
+    def on_message(message):
+        received.append(message)
+        if len(received) == len(EVENTS):
+            result['elapsed'] = time.perf_counter() - result['start']
+            client.logout()
+
+    client.on_message = on_message
+    client.login('benchmark@example.com', 'password')
+    client.run()
+    return result['bytes'], result['elapsed']
+
+print('{:<12} {:>14} {:>22}'.format('mode', 'bytes on wire', 'READY -> last event'))
+for mode in (None, 'zlib', 'zlib-stream'):
+    sent, elapsed = run(mode)
+    print('{:<12} {:>14,} {:>19.0f} ms'.format(str(mode), sent, elapsed * 1e3))
+
+compressed = zlib.compress(READY.encode('utf-8'))
+rounds = 5
+plain = min(timeit.repeat(lambda: json.loads(READY), number=1, repeat=rounds))
+inflated = min(timeit.repeat(lambda: json.loads(zlib.decompress(compressed).decode('utf-8')), number=1, repeat=rounds))
+print('decoding the {:.2f} MB READY: json.loads {:.0f} ms, inflate + json.loads {:.0f} ms'.format(
+      len(READY) / 1e6, plain * 1e3, inflated * 1e3))
@@ -0,0 +1,45 @@
+"""Measures the fixed cost of handling one gateway frame.
+
+Frames are fed straight into WebSocket.received_message without a
+connection. TYPING_START has no state handler and no listener is
+registered, so what is left is decoding, logging and dispatch overhead.
+Debug logging is off. Run it with::
+
+    python benchmarks/gateway_frame.py [calls] [batches]
+"""
+
+import json
+import logging
+import sys
+import time
+
+import synthetic  # puts this checkout first on sys.path
+import discord
+from discord.client import WebSocket
+from ws4py.messaging import TextMessage
+
+calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+batches = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+logging.basicConfig(level=logging.WARNING)
+
+client = discord.Client()
+client.ws = WebSocket(client.dispatch, 'ws://127.0.0.1:1/gateway', codec=client._codec,
+                      listening=client._listening)
+
+def typing(**extra):
+    data = {'user_id': '1', 'channel_id': '2', 'timestamp': 1}
+    data.update(extra)
+    return TextMessage(json.dumps({'op': 0, 's': 5, 't': 'TYPING_START', 'd': data}))
+
+def measure(frame):
+    best = float('inf')
+    for _ in range(batches):
+        start = time.perf_counter()
+        for _ in range(calls):
+            client.ws.received_message(frame)
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e6
+
+print('small frame: {:6.2f} us'.format(measure(typing())))
+print('10 KB frame: {:6.2f} us'.format(measure(typing(payload=['x' * 50] * 200))))
@@ -0,0 +1,78 @@
+"""Measures how long a client takes to be back in sync after the websocket drops.
+
+A local gateway sends a READY with four 5000 member servers, then closes
+the connection. When the client reconnects, the gateway either accepts
+the RESUME, replays the missed message and sends RESUMED, or rejects it
+as an invalid session, so the client has to identify again and receive a
+new READY. For both cases this reports the time from the new connection
+to on_resumed or on_ready, and the bytes the gateway sent on it. Needs
+aiohttp. Run it with::
+
+    python benchmarks/gateway_resume.py
+"""
+
+import asyncio
+import json
+import time
+
+from synthetic import make_guild, ready, message
+from local_gateway import LocalGateway
+import discord
+
+READY = json.dumps({'op': 0, 's': 1, 't': 'READY',
+                    'd': ready([make_guild(str(100 + index), members=5000) for index in range(4)])})
+
+state = {'accept_resume': True, 'connections': 0}
+
+async def gateway_session(request, websocket):
+    state['connections'] += 1
+    state['start'] = time.perf_counter()
+    sent = 0
+
+    async def send(payload):
+        nonlocal sent
+        sent += len(payload.encode('utf-8'))
+        await websocket.send_str(payload)
+
+    first = json.loads((await websocket.receive()).data)
+    if first['op'] == 6 and state['accept_resume']:
+        await send(json.dumps({'op': 0, 's': 3, 't': 'MESSAGE_CREATE', 'd': message(3, '100', '10000000', 'missed')}))
+        await send(json.dumps({'op': 0, 's': 4, 't': 'RESUMED', 'd': {'heartbeat_interval': 41250}}))
+    else:
+        if first['op'] == 6:
+            await send(json.dumps({'op': 9, 'd': False}))
+            await websocket.receive()
+        await send(READY)
+        await send(json.dumps({'op': 0, 's': 2, 't': 'MESSAGE_CREATE', 'd': message(2, '100', '10000000', 'before')}))
+    state['bytes'] = sent
+
+    if state['connections'] == 1:
+        # drop the first connection once the client had time to process READY
+        await asyncio.sleep(1)
+        return
+
+    async for _ in websocket:
+        pass
+
+gateway = LocalGateway(gateway_session)
+
+def run(accept_resume):
+    state['accept_resume'] = accept_resume
+    state['connections'] = 0
+    client = discord.Client(reconnect_base=0.01, reconnect_jitter=0)
+
+    def synced():
+        if state['connections'] > 1:
+            state['elapsed'] = time.perf_counter() - state['start']
+            client.logout()
+
+    client.on_ready = synced
+    client.on_resumed = synced
+    client.login('benchmark@example.com', 'password')
+    client.run()
+    return state['elapsed'], state['bytes'], len(client.servers)
+
+print('{:<24} {:>10} {:>14} {:>8}'.format('reconnect', 'time', 'bytes sent', 'servers'))
+for name, accept_resume in (('resume', True), ('invalid session, READY', False)):
+    elapsed, sent, servers = run(accept_resume)
+    print('{:<24} {:>7.1f} ms {:>14,} {:>8}'.format(name, elapsed * 1e3, sent, servers))
@@ -0,0 +1,28 @@
+"""Measures how long a large GUILD_CREATE takes to load.
+
+The guild has 50 roles and 50 channels, every member has three roles and
+half of the members are online. Run it with::
+
+    python benchmarks/guild_ingest.py [members ...]
+"""
+
+import sys
+import time
+
+from synthetic import make_guild
+from discord.state import ConnectionState
+
+sizes = [int(arg) for arg in sys.argv[1:]] or [5000, 20000, 50000]
+
+for members in sizes:
+    guild = make_guild('100', members=members, roles=50, channels=50)
+    roles = guild['roles']
+    for index, member in enumerate(guild['members']):
+        member['roles'] = [roles[1 + (index + offset) % 49]['id'] for offset in range(3)]
+
+    state = ConnectionState(lambda *args: None)
+    start = time.perf_counter()
+    state.handle_guild_create(guild)
+    elapsed = time.perf_counter() - start
+
+    print('{:>6} members, {:>6} presences: {:.3f} s'.format(members, len(guild['presences']), elapsed))
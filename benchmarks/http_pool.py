@@ -0,0 +1,65 @@
+"""Compares per-call latency of the module-level requests helpers with the
+pooled session used by the client.
+
+Both send POSTs to a local keep-alive HTTP server that stands in for the
+API, so no network or TLS is involved. Run it with::
+
+    python benchmarks/http_pool.py [calls]
+"""
+
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import requests
+
+import synthetic  # puts this checkout first on sys.path
+from discord.http import HTTPClient
+
+calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # otherwise small keep-alive responses wait on delayed ACKs
+    disable_nagle_algorithm = True
+    body = b'{"id": "1"}'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+server = StandInServer(('127.0.0.1', 0), StandInHandler)
+thread = threading.Thread(target=server.serve_forever)
+thread.daemon = True
+thread.start()
+
+url = 'http://127.0.0.1:{}/api/channels/1/messages'.format(server.server_address[1])
+payload = {'content': 'benchmark'}
+
+def measure(post):
+    start = time.perf_counter()
+    for _ in range(calls):
+        post(url, json=payload)
+    return (time.perf_counter() - start) / calls * 1e3
+
+unpooled = measure(requests.post)
+http = HTTPClient(timeout=5)
+pooled = measure(http.post)
+http.close()
+server.shutdown()
+
+print('requests.post:  {:.3f} ms/call'.format(unpooled))
+print('pooled session: {:.3f} ms/call'.format(pooled))
@@ -0,0 +1,66 @@
+"""Compares the JSON codecs on a corpus of gateway events.
+
+The corpus is one READY with four 2000 member guilds followed by a mix of
+MESSAGE_CREATE, PRESENCE_UPDATE and GUILD_MEMBER_UPDATE events, shaped
+like what the gateway sends. Codecs that are not installed are skipped.
+Run it with::
+
+    python benchmarks/json_codec.py [events]
+"""
+
+import json
+import random
+import sys
+import time
+
+from synthetic import make_guild, ready, message, user
+from discord.codec import get_codec
+
+events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+def build_corpus():
+    random.seed(1)
+    guilds = [make_guild(str(100 + index), members=2000) for index in range(4)]
+    corpus = [{'op': 0, 's': 1, 't': 'READY', 'd': ready(guilds)}]
+    for index in range(events):
+        user_id = str(10000000 + index % 2000)
+        kind = random.random()
+        if kind < 0.6:
+            content = u'hello world {} é中'.format(index)
+            corpus.append({'op': 0, 's': index, 't': 'MESSAGE_CREATE',
+                           'd': message(index, '100', '10000001', content)})
+        elif kind < 0.9:
+            corpus.append({'op': 0, 's': index, 't': 'PRESENCE_UPDATE',
+                           'd': {'user': {'id': user_id}, 'status': 'online', 'game_id': None,
+                                 'guild_id': '100', 'roles': ['100001']}})
+        else:
+            corpus.append({'op': 0, 's': index, 't': 'GUILD_MEMBER_UPDATE',
+                           'd': {'user': user(user_id), 'roles': ['100001', '100002'], 'guild_id': '100'}})
+    return corpus
+
+objects = build_corpus()
+frames = [json.dumps(event) for event in objects]
+size = sum(len(frame.encode('utf-8')) for frame in frames)
+print('corpus: {} events, {:.1f} MB'.format(len(frames), size / 1e6))
+
+for name in ('json', 'ujson', 'orjson'):
+    try:
+        codec = get_codec(name)
+    except ImportError:
+        print('{:<6} not installed'.format(name))
+        continue
+
+    decode = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for frame in frames:
+            codec.loads(frame)
+        decode = min(decode, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for event in objects[1:]:
+        codec.dumps(event)
+    encode = time.perf_counter() - start
+
+    print('{:<6} decode {:6.1f} ms {:6.1f} MB/s {:8.0f} events/s | encode {:6.1f} ms'.format(
+          name, decode * 1e3, size / decode / 1e6, len(frames) / decode, encode * 1e3))
@@ -0,0 +1,66 @@
+"""A local stand-in for the Discord login, gateway lookup and websocket.
+
+The benchmarks that need a live connection start one of these and point
+``discord.endpoints`` at it. It runs an aiohttp server on its own thread
+and event loop, so aiohttp has to be installed.
+"""
+
+import asyncio
+import threading
+
+import synthetic  # puts this checkout first on sys.path
+from discord import endpoints
+
+from aiohttp import web
+
+class LocalGateway(object):
+    """Serves the REST calls a client makes to connect, and hands every
+    websocket connection to ``handler(request, websocket)``, a coroutine
+    function. The connection is closed once the handler returns.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        started = threading.Event()
+        thread = threading.Thread(target=self._serve, args=(started,))
+        thread.daemon = True
+        thread.start()
+        started.wait()
+
+        base = 'http://127.0.0.1:{}/api'.format(self.port)
+        endpoints.LOGIN = base + '/auth/login'
+        endpoints.LOGOUT = base + '/auth/logout'
+        endpoints.GATEWAY = base + '/gateway'
+
+    def _serve(self, started):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_post('/api/auth/login', self._login)
+        app.router.add_post('/api/auth/logout', self._logout)
+        app.router.add_get('/api/gateway', self._gateway)
+        app.router.add_get('/gateway', self._websocket)
+
+        runner = web.AppRunner(app)
+        self.loop.run_until_complete(runner.setup())
+        self.loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', 0).start())
+        self.port = runner.addresses[0][1]
+        started.set()
+        self.loop.run_forever()
+
+    async def _login(self, request):
+        return web.json_response({'token': 'benchmark'})
+
+    async def _logout(self, request):
+        return web.Response(status=204)
+
+    async def _gateway(self, request):
+        return web.json_response({'url': 'ws://127.0.0.1:{}/gateway'.format(self.port)})
+
+    async def _websocket(self, request):
+        websocket = web.WebSocketResponse(protocols=('chat',))
+        await websocket.prepare(request)
+        await self.handler(request, websocket)
+        await websocket.close()
+        return websocket
@@ -0,0 +1,26 @@
+"""Measures how long a MESSAGE_UPDATE takes as the server grows.
+
+An edit should not cost more in a bigger server. Run it with::
+
+    python benchmarks/message_edit.py [edits]
+"""
+
+import sys
+import time
+
+from synthetic import make_guild, ready, message
+from discord.state import ConnectionState
+
+edits = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+for members in (100, 1000, 10000):
+    state = ConnectionState(lambda *args: None)
+    state.handle_ready(ready([make_guild('100', members=members, roles=20, channels=20)]))
+    state.handle_message_create(message(1, '1001', '10000001'))
+
+    start = time.perf_counter()
+    for index in range(edits):
+        state.handle_message_update({'id': '1', 'content': 'edit {}'.format(index), 'channel_id': '1001'})
+    elapsed = time.perf_counter() - start
+
+    print('{:>6} members: {:8.1f} us/edit'.format(members, elapsed / edits * 1e6))
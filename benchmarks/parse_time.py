@@ -0,0 +1,56 @@
+"""Compares utils.parse_time with the regex parser it replaced.
+
+The corpus covers the four timestamp shapes the gateway sends: with and
+without microseconds, each with and without a +00:00 offset. Every
+timestamp is checked to parse to the same value with both parsers before
+anything is timed. Run it with::
+
+    python benchmarks/parse_time.py [timestamps]
+"""
+
+import datetime
+import random
+import sys
+import timeit
+
+import synthetic  # puts this checkout first on sys.path
+from discord import utils
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+rounds = 20
+
+def build_corpus():
+    random.seed(1)
+    corpus = []
+    start = datetime.datetime(2015, 1, 1)
+    for index in range(count):
+        value = start + datetime.timedelta(seconds=random.randint(0, 10 ** 8),
+                                           microseconds=random.randint(0, 999999))
+        timestamp = value.strftime('%Y-%m-%dT%H:%M:%S')
+        shape = index % 4
+        if shape == 0:
+            timestamp += '.{:06d}+00:00'.format(value.microsecond)
+        elif shape == 1:
+            timestamp += '+00:00'
+        elif shape == 2:
+            timestamp += '.{:06d}'.format(value.microsecond)
+        corpus.append(timestamp)
+    return corpus
+
+corpus = build_corpus()
+
+mismatches = [timestamp for timestamp in corpus if utils.parse_time(timestamp) != utils._parse_time_slow(timestamp)]
+if mismatches:
+    print('parse_time disagrees with the regex parser on {} timestamps, e.g. {!r}'.format(len(mismatches), mismatches[0]))
+    sys.exit(1)
+print('{} timestamps, both parsers agree'.format(len(corpus)))
+
+def measure(parse, timestamps):
+    elapsed = timeit.timeit(lambda: [parse(timestamp) for timestamp in timestamps], number=rounds)
+    return elapsed / rounds / len(timestamps) * 1e6
+
+print('regex parser:         {:5.2f} us/timestamp'.format(measure(utils._parse_time_slow, corpus)))
+print('parse_time:           {:5.2f} us/timestamp'.format(measure(utils.parse_time, corpus)))
+# Member.joined_at repeats a lot while a server is loaded
+joined_at = ['2015-08-21T12:03:45.782000+00:00'] * len(corpus)
+print('cached joined_at hit: {:5.2f} us/timestamp'.format(measure(utils._parse_time_cached, joined_at)))
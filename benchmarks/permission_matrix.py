@@ -0,0 +1,91 @@
+"""Measures Server.permissions_matrix on a large synthetic server.
+
+The server has 40 roles with skewed membership (most members have zero to
+three of the first few roles) and every channel has five role and three
+member overwrites. The matrix is compared with calling
+Channel.permissions_for for every member on a cold cache, extrapolated
+from the first 20 channels. Run it with::
+
+    python benchmarks/permission_matrix.py [members] [channels]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from synthetic import ready, user, TIMESTAMP
+from discord.state import ConnectionState
+
+members = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+channels = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+read_messages = 1 << 10
+
+def make_guild(seed=1):
+    random.seed(seed)
+    guild_id = '100'
+    # bit 3 is administrator, only every ninth role may have it
+    roles = [{'id': guild_id, 'name': '@everyone', 'permissions': random.getrandbits(26) & ~(1 << 3),
+              'position': -1, 'color': 0, 'hoist': False, 'managed': False}]
+    for index in range(1, 40):
+        value = random.getrandbits(26)
+        if index % 9:
+            value &= ~(1 << 3)
+        roles.append({'id': str(1000 + index), 'name': 'role{}'.format(index), 'permissions': value,
+                      'position': index, 'color': 0, 'hoist': False, 'managed': False})
+
+    role_ids = [role['id'] for role in roles[1:]]
+    weights = [1.0 / (index + 1) for index in range(len(role_ids))]
+    member_list = []
+    for index in range(members):
+        count = random.choice((0, 0, 1, 1, 1, 2, 2, 3))
+        member_list.append({'deaf': False, 'mute': False, 'joined_at': TIMESTAMP,
+                            'user': user(50000 + index, 'user{}'.format(index)),
+                            'roles': list(set(random.choices(role_ids, weights, k=count)))})
+
+    channel_list = []
+    for index in range(channels):
+        overwrites = [{'id': role['id'], 'type': 'role', 'allow': random.getrandbits(26),
+                       'deny': random.getrandbits(26)} for role in random.sample(roles, 5)]
+        overwrites += [{'id': member['user']['id'], 'type': 'member', 'allow': random.getrandbits(26),
+                        'deny': random.getrandbits(26)} for member in random.sample(member_list, 3)]
+        channel_list.append({'id': guild_id if index == 0 else str(90000 + index), 'name': 'channel{}'.format(index),
+                             'topic': None, 'position': index, 'type': 'text',
+                             'permission_overwrites': overwrites, 'guild_id': guild_id})
+
+    return {'id': guild_id, 'name': 'guild', 'roles': roles, 'members': member_list,
+            'owner_id': member_list[0]['user']['id'], 'presences': [], 'channels': channel_list,
+            'region': 'us-west', 'afk_timeout': 300, 'afk_channel_id': None, 'icon': None,
+            'voice_states': []}
+
+state = ConnectionState(lambda *args: None)
+state.handle_ready(ready([make_guild()]))
+server = state.servers[0]
+print('{} members, {} channels'.format(len(server.members), len(server.channels)))
+
+start = time.perf_counter()
+matrix = server.permissions_matrix()
+build = time.perf_counter() - start
+
+tracemalloc.start()
+traced = server.permissions_matrix()
+memory = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+del traced
+
+start = time.perf_counter()
+for channel in server.channels:
+    matrix.members_with(channel, read_messages)
+query = time.perf_counter() - start
+
+sample = list(server.channels)[:20]
+for channel in sample:
+    channel._permissions_cache.clear()
+start = time.perf_counter()
+for channel in sample:
+    [member.id for member in server.members if channel.permissions_for(member).can_read_messages]
+loop = (time.perf_counter() - start) * len(server.channels) / len(sample)
+
+print('build:                          {:8.1f} ms ({:.0f} KB)'.format(build * 1e3, memory / 1024))
+print('members_with x {:<4} channels:   {:8.1f} ms'.format(len(server.channels), query * 1e3))
+print('cold permissions_for loop:      {:8.0f} ms'.format(loop * 1e3))
@@ -0,0 +1,117 @@
+"""Checks that the client side rate limiter stops REST calls from being lost.
+
+A local HTTP server stands in for the API and allows 5 requests per
+0.5 second window on a route, answering anything over that with a 429.
+Four threads each send 5 POSTs to the same channel through an
+HTTPClient, with and without the limiter, and with the limiter but
+without the X-RateLimit headers, so only the 429 retries help. Run it
+with::
+
+    python benchmarks/ratelimit.py
+"""
+
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import synthetic  # puts this checkout first on sys.path
+from discord.http import HTTPClient
+
+LIMIT = 5
+WINDOW = 0.5
+THREADS = 4
+REQUESTS = 5
+
+class Window(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset(headers=True)
+
+    def reset(self, headers):
+        self.headers = headers
+        self.count = 0
+        self.reset_at = time.time() + WINDOW
+        self.limited = 0
+
+    def hit(self):
+        with self.lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self.count = 0
+                self.reset_at = now + WINDOW
+            self.count += 1
+            over = self.count > LIMIT
+            if over:
+                self.limited += 1
+            return over, max(0, LIMIT - self.count), self.reset_at, now
+
+window = Window()
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # otherwise small keep-alive responses wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        over, remaining, reset_at, now = window.hit()
+        if over:
+            code = 429
+            body = json.dumps({'retry_after': int((reset_at - now) * 1000) + 1}).encode('utf-8')
+        else:
+            code = 200
+            body = b'{"id": "1"}'
+
+        self.send_response(code)
+        if window.headers:
+            self.send_header('X-RateLimit-Limit', str(LIMIT))
+            self.send_header('X-RateLimit-Remaining', str(remaining))
+            self.send_header('X-RateLimit-Reset', '{:.3f}'.format(reset_at))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+server = StandInServer(('127.0.0.1', 0), RateLimitedHandler)
+thread = threading.Thread(target=server.serve_forever)
+thread.daemon = True
+thread.start()
+
+url = 'http://127.0.0.1:{}/api/channels/1/messages'.format(server.server_address[1])
+
+def run(ratelimit, headers):
+    window.reset(headers)
+    http = HTTPClient(ratelimit=ratelimit)
+    statuses = []
+
+    def send():
+        for _ in range(REQUESTS):
+            statuses.append(http.post(url, json={'content': 'benchmark'}).status_code)
+
+    start = time.time()
+    threads = [threading.Thread(target=send) for _ in range(THREADS)]
+    for worker in threads:
+        worker.start()
+    for worker in threads:
+        worker.join()
+    elapsed = time.time() - start
+    http.close()
+    return statuses.count(200), len(statuses) - statuses.count(200), window.limited, elapsed
+
+print('{:<28} {:>4} {:>5} {:>12} {:>7}'.format('', 'sent', 'lost', '429s served', 'time'))
+for name, ratelimit, headers in (('no limiter', False, True),
+                                 ('limiter', True, True),
+                                 ('limiter, no headers', True, False)):
+    sent, lost, limited, elapsed = run(ratelimit, headers)
+    print('{:<28} {:>4} {:>5} {:>12} {:>6.2f}s'.format(name, sent, lost, limited, elapsed))
+
+server.shutdown()
@@ -0,0 +1,96 @@
+"""Synthetic gateway payloads shared by the benchmark scripts.
+
+Importing this module puts the repository root first on ``sys.path`` so
+the benchmarks always measure the ``discord`` package in this checkout.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TIMESTAMP = '2015-08-21T12:03:45.782000+00:00'
+
+def user(user_id, name='user'):
+    return {'username': name, 'id': str(user_id), 'discriminator': '0001', 'avatar': None}
+
+def make_guild(guild_id='100', members=50, roles=5, channels=4, presences=True):
+    """Returns a GUILD_CREATE payload.
+
+    Every member gets one of the non-default roles, channel 1 has a role
+    and a member overwrite, channel 3 is a voice channel and half of the
+    members are online.
+    """
+    base = int(guild_id)
+    role_list = [{'id': guild_id, 'name': '@everyone', 'permissions': 0b00000000000000111111110000000001,
+                  'position': -1, 'color': 0, 'hoist': False, 'managed': False}]
+    for index in range(1, roles):
+        role_list.append({'id': str(base * 1000 + index), 'name': 'role{}'.format(index),
+                          'permissions': 1 << (index % 6), 'position': index, 'color': 0,
+                          'hoist': False, 'managed': False})
+
+    member_list = []
+    for index in range(members):
+        member_roles = [role_list[1 + index % (roles - 1)]['id']] if roles > 1 else []
+        member_list.append({'deaf': False, 'mute': False, 'joined_at': TIMESTAMP,
+                            'user': user(base * 100000 + index, 'user{}'.format(index)),
+                            'roles': member_roles})
+
+    channel_list = []
+    for index in range(channels):
+        overwrites = []
+        if index == 1 and roles > 1 and members:
+            overwrites.append({'id': role_list[1]['id'], 'type': 'role', 'allow': 1 << 13, 'deny': 1 << 11})
+            overwrites.append({'id': member_list[0]['user']['id'], 'type': 'member', 'allow': 1 << 11, 'deny': 0})
+        channel_list.append({'id': guild_id if index == 0 else str(base * 10 + index),
+                             'name': 'channel{}'.format(index), 'topic': None, 'position': index,
+                             'type': 'voice' if index == 3 else 'text',
+                             'permission_overwrites': overwrites, 'guild_id': guild_id})
+
+    voice_states = []
+    if channels > 3 and members > 1:
+        voice_states.append({'user_id': member_list[1]['user']['id'], 'channel_id': channel_list[3]['id'],
+                             'self_mute': False, 'self_deaf': False, 'suppress': False,
+                             'mute': False, 'deaf': False})
+
+    online = member_list[::2] if presences else []
+    return {
+        'id': guild_id,
+        'name': 'guild' + guild_id,
+        'roles': role_list,
+        'members': member_list,
+        'owner_id': member_list[0]['user']['id'] if member_list else None,
+        'presences': [{'user': {'id': m['user']['id']}, 'status': 'online', 'game_id': None} for m in online],
+        'channels': channel_list,
+        'region': 'us-west',
+        'afk_timeout': 300,
+        'afk_channel_id': None,
+        'icon': None,
+        'voice_states': voice_states
+    }
+
+def ready(guilds):
+    """Returns a READY payload for the given guild payloads."""
+    return {
+        'user': user(1, 'bot'),
+        'guilds': guilds,
+        'private_channels': [{'id': '555', 'recipient': user(2, 'pm')}],
+        'heartbeat_interval': 41250,
+        'session_id': 'benchmark'
+    }
+
+def message(message_id, channel_id, author_id, content='hello'):
+    """Returns a MESSAGE_CREATE payload."""
+    return {
+        'id': str(message_id),
+        'channel_id': channel_id,
+        'content': content,
+        'timestamp': TIMESTAMP,
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'embeds': [],
+        'attachments': [],
+        'author': user(author_id, 'author'),
+        'mentions': []
+    }
@@ -21,14 +21,25 @@ __build__ = 0x008000
 from .client import Client
 from .user import User
 from .channel import Channel, PrivateChannel
-from .server import Server, Member
+from .server import Server, Member, PermissionMatrix
 from .message import Message
 from .errors import *
-from .permissions import Permissions
+from .permissions import Permissions, FrozenPermissions
 from .role import Role, Colour, Color
 from .invite import Invite
 from . import utils
 
+import sys
+
+# AsyncClient needs async/await, asyncio.run and aiohttp 3.7, all of which
+# require Python 3.7 or newer. The rest of the library keeps working without it.
+if sys.version_info >= (3, 7):
+    try:
+        from .async_client import AsyncClient
+    except (ImportError, SyntaxError):
+        # aiohttp is not installed
+        pass
+
 import logging
 
 try:
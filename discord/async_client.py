@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from . import endpoints
+from .errors import InvalidDestination, GatewayNotFound
+from .user import User
+from .channel import Channel, PrivateChannel
+from .message import Message
+from .state import ConnectionState
+from .codec import get_codec
+from . import gateway
+
+import aiohttp
+import asyncio
+import traceback
+import logging
+import time
+import sys
+import re
+
+log = logging.getLogger(__name__)
+request_logging_format = '{name}: {method} {response.url} has returned {response.status}'
+
+def is_response_successful(response):
+    """Helper function for checking if the status code is in the 200 range"""
+    return 200 <= response.status < 300
+
+class AsyncClient(object):
+    """Represents a client connection to Discord that runs on an :mod:`asyncio` event loop.
+
+    Unlike :class:`Client` no threads are used. The websocket is read by a
+    task, the heartbeat is another task and the REST calls use aiohttp_, so
+    many clients can share a single event loop. The cached state is kept by
+    the same code as :class:`Client` and uses the same model classes.
+
+    Events are registered the same way as with :class:`Client`, either through
+    :meth:`event` or by subclassing. An event may be a plain function or a
+    coroutine function, in which case it is scheduled as a task so a slow
+    handler never holds up the websocket. ::
+
+        client = discord.AsyncClient()
+
+        @client.event
+        async def on_message(message):
+            if message.content.startswith('!ping'):
+                await client.send_message(message.channel, 'pong')
+
+        client.run('email', 'password')
+
+    Running multiple clients on one loop: ::
+
+        async def main():
+            await asyncio.gather(first.start(email, password), second.start(other_email, other_password))
+
+    This class requires Python 3.7 or newer and aiohttp_ to be installed. It accepts the same ``max_length``,
+    ``message_eviction``, ``message_cache_mode``, ``max_bucket_length`` and ``lazy_members``
+    options as :class:`Client` and also:
+
+    :param int http_pool_size: The maximum number of HTTP connections kept open. Defaults to 10.
+    :param float http_timeout: The total timeout in seconds for every REST call. Defaults to None.
+
+    The ``json_codec``, ``gateway_compression``, ``reconnect_base``, ``reconnect_cap``,
+    ``reconnect_jitter`` and ``reconnect_max_attempts`` options of :class:`Client` are supported as well.
+
+    .. _aiohttp: https://aiohttp.readthedocs.io/
+    """
+
+    def __init__(self, **kwargs):
+        self.options = kwargs
+        self._codec = get_codec(kwargs.get('json_codec'))
+        self.connection = ConnectionState(self.dispatch, **kwargs)
+        self.token = ''
+        self.headers = {
+            'authorization': self.token,
+        }
+        self.ws = None
+        self.session = None
+        self._closed = False
+        self._is_logged_in = False
+        self._keep_alive = None
+        self._sequence = None
+        self._inflator = None
+        self._gateway = None
+        self._backoff = gateway.Backoff(kwargs)
+        self._heartbeat_interval = None
+        # references to running event tasks so they are not garbage collected
+        self._event_tasks = set()
+
+    @property
+    def user(self):
+        """A :class:`User` that represents the connected client. None if not logged in."""
+        return self.connection.user
+
+    @property
+    def email(self):
+        """The email used to login. This is only set if login is successful, otherwise it's None."""
+        return self.connection.email
+
+    @property
+    def servers(self):
+        """A read-only list-like view of the :class:`Server` that the connected client has available."""
+        return self.connection.servers
+
+    @property
+    def private_channels(self):
+        """A read-only list-like view of the :class:`PrivateChannel` that the connected client is participating on."""
+        return self.connection.private_channels
+
+    @property
+    def messages(self):
+        """A read-only deque-like sequence of :class:`Message` that the client has received."""
+        return self.connection.messages
+
+    @property
+    def is_logged_in(self):
+        """Returns True if the client is successfully logged in. False otherwise."""
+        return self._is_logged_in
+
+    def get_channel(self, id):
+        """Returns a :class:`Channel` or :class:`PrivateChannel` with the
+        following ID. If not found, returns None.
+        """
+        return self.connection.get_channel(id)
+
+    def event(self, function):
+        """A decorator that registers an event to listen to. The function can
+        be either a plain function or a coroutine function.
+        """
+        setattr(self, function.__name__, function)
+        log.info('{0.__name__} has successfully been registered as an event'.format(function))
+        return function
+
+    def on_error(self, event_method, *args, **kwargs):
+        print('Ignoring exception in {}'.format(event_method), file=sys.stderr)
+        traceback.print_exc()
+
+    async def _run_event(self, event_method, coro, *args, **kwargs):
+        try:
+            await coro
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.on_error(event_method, *args, **kwargs)
+
+    def dispatch(self, event, *args, **kwargs):
+        log.debug('Dispatching event %s', event)
+        event_method = 'on_' + event
+        handler = getattr(self, event_method, None)
+        if handler is None:
+            return
+
+        try:
+            result = handler(*args, **kwargs)
+        except Exception:
+            self.on_error(event_method, *args, **kwargs)
+            return
+
+        if asyncio.iscoroutine(result):
+            task = asyncio.ensure_future(self._run_event(event_method, result, *args, **kwargs))
+            self._event_tasks.add(task)
+            task.add_done_callback(self._event_tasks.discard)
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.options.get('http_pool_size', 10))
+            timeout = aiohttp.ClientTimeout(total=self.options.get('http_timeout'))
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def login(self, email, password):
+        """|coro| Logs in the user with the following credentials.
+
+        Unlike :meth:`Client.login` this does not connect to the websocket,
+        use :meth:`connect` or :meth:`start` for that.
+
+        :param str email: The email used to login.
+        :param str password: The password used to login.
+        """
+        payload = {
+            'email': email,
+            'password': password
+        }
+
+        async with self._get_session().post(endpoints.LOGIN, json=payload) as r:
+            if not is_response_successful(r):
+                log.error(request_logging_format.format(name='login', method='POST', response=r))
+                return
+
+            body = await r.json(loads=self._codec.loads)
+
+        log.info('logging in returned status code {}'.format(r.status))
+        self.connection.email = email
+        self.token = body['token']
+        self.headers['authorization'] = self.token
+        self._is_logged_in = True
+
+    async def _get_gateway(self):
+        if self._gateway is None:
+            async with self._get_session().get(endpoints.GATEWAY, headers=self.headers) as r:
+                if r.status != 200:
+                    raise GatewayNotFound()
+                data = await r.json(loads=self._codec.loads)
+                self._gateway = data.get('url')
+        return self._gateway
+
+    async def _keep_alive_loop(self, interval):
+        while not self.ws.closed:
+            await asyncio.sleep(interval)
+            await self.ws.send_str(gateway.heartbeat(self._codec))
+
+    async def _received_message(self, response):
+        op = response.get('op')
+        data = response.get('d')
+
+        if op == 9:
+            # the session could not be resumed, start over with a fresh state
+            log.info('session could not be resumed, identifying again')
+            email = self.email
+            self.connection = ConnectionState(self.dispatch, **self.options)
+            self.connection.email = email
+            self._sequence = None
+            await self._identify()
+            return
+
+        if op != 0:
+            log.info('Unhandled op %s', op)
+            return
+
+        sequence = response.get('s')
+        if sequence is not None:
+            self._sequence = sequence
+
+        event = response.get('t')
+
+        if event in ('READY', 'RESUMED'):
+            self._backoff.reset()
+            self._heartbeat_interval = data.get('heartbeat_interval', self._heartbeat_interval)
+            if self._keep_alive is None and self._heartbeat_interval is not None:
+                interval = self._heartbeat_interval / 1000.0
+                self._keep_alive = asyncio.ensure_future(self._keep_alive_loop(interval))
+
+        handler = self.connection.parsers.get(event)
+        if handler is None:
+            log.info('Unhandled event %s', event)
+            return
+
+        self.dispatch('socket_update', event, data)
+        handler(data)
+
+    async def _identify(self):
+        await self.ws.send_str(gateway.identify(self._codec, self.token, self.options.get('gateway_compression')))
+
+    async def _resume(self):
+        await self.ws.send_str(gateway.resume(self._codec, self.token, self.connection.session_id, self._sequence))
+
+    async def connect(self, resume=False):
+        """|coro| Connects to the websocket and processes events until the
+        connection is closed. Call :meth:`login` first.
+
+        :param bool resume: Whether to resume the previous session instead of
+                            identifying again, keeping the cached state.
+        """
+        url = await self._get_gateway()
+        if url is None:
+            raise GatewayNotFound()
+        log.info('websocket gateway found')
+
+        compression = self.options.get('gateway_compression')
+        url = gateway.connection_url(url, compression)
+        # every connection starts a new compression context
+        self._inflator = gateway.Inflator(compression)
+        self.ws = await self._get_session().ws_connect(url, protocols=('http-only', 'chat'))
+        log.info('websocket has connected')
+        self.dispatch('socket_opened')
+
+        if resume and self.connection.session_id is not None and self._sequence is not None:
+            await self._resume()
+        else:
+            await self._identify()
+
+        try:
+            async for msg in self.ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    await self._received_message(self._codec.loads(msg.data))
+                elif msg.type == aiohttp.WSMsgType.BINARY:
+                    payload = self._inflator.decompress(msg.data)
+                    if payload is not None:
+                        await self._received_message(self._codec.loads(payload))
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    log.info('websocket errored with {}'.format(self.ws.exception()))
+                    break
+        finally:
+            if self._keep_alive is not None:
+                self._keep_alive.cancel()
+                self._keep_alive = None
+            await self.ws.close()
+            log.info('Closed with {} at {}'.format(self.ws.close_code, int(time.time())))
+            self.dispatch('socket_closed')
+
+    async def start(self, email, password):
+        """|coro| Logs in and keeps the client connected until :meth:`close` is
+        called. When the websocket is closed the session is resumed, keeping the
+        cached state.
+        """
+        await self.login(email, password)
+        if not self._is_logged_in:
+            return
+
+        await self.connect()
+
+        while not self._closed:
+            delay = self._backoff.next_delay()
+            if delay is None:
+                break
+
+            self.dispatch('reconnect_attempt', self._backoff.attempts, delay)
+            await asyncio.sleep(delay)
+            if self._closed:
+                break
+
+            try:
+                await self.connect(resume=True)
+            except (GatewayNotFound, aiohttp.ClientError, OSError) as e:
+                self._backoff.failed(e)
+                # the gateway may have moved, look it up again next time
+                self._gateway = None
+                continue
+
+            self._backoff.succeeded()
+
+        log.info('Client exiting')
+
+    def run(self, email, password):
+        """Runs the client on a new event loop until it is closed. This is a blocking call.
+
+        To run several clients on one loop, use :meth:`start` instead.
+        """
+        async def runner():
+            try:
+                await self.start(email, password)
+            finally:
+                await self.close()
+
+        asyncio.run(runner())
+
+    async def close(self):
+        """|coro| Closes the websocket and the HTTP session."""
+        self._closed = True
+        if self.ws is not None and not self.ws.closed:
+            await self.ws.close()
+        if self.session is not None:
+            await self.session.close()
+        self._is_logged_in = False
+
+    async def logout(self):
+        """|coro| Logs out of Discord and closes all connections."""
+        async with self._get_session().post(endpoints.LOGOUT, headers=self.headers) as response:
+            log.debug(request_logging_format.format(name='logout', method='POST', response=response))
+        await self.close()
+
+    def _resolve_mentions(self, content, mentions):
+        if isinstance(mentions, list):
+            return [user.id for user in mentions]
+        elif mentions == True:
+            return re.findall(r'<@(\d+)>', content)
+        else:
+            return []
+
+    async def _resolve_destination(self, destination):
+        if isinstance(destination, (Channel, PrivateChannel)):
+            return (destination.id, destination.is_private)
+        elif isinstance(destination, User):
+            found = self.connection._get_private_channel_by_user(destination.id)
+            if found is None:
+                # Couldn't find the user, so start a PM with them first.
+                found = await self.start_private_message(destination)
+                if found is None:
+                    raise InvalidDestination('Could not start a private message with {0.id}'.format(destination))
+            return (found.id, True)
+        elif isinstance(destination, str):
+            return (destination, True)
+        else:
+            raise InvalidDestination('Destination must be Channel, PrivateChannel, User, or str')
+
+    async def start_private_message(self, user):
+        """|coro| Starts a private message with the user.
+
+        :param user: A :class:`User` to start the private message with.
+        :return: The new :class:`PrivateChannel` or None if an error occurred.
+        """
+        if not isinstance(user, User):
+            raise TypeError('user argument must be a User')
+
+        payload = {
+            'recipient_id': user.id
+        }
+
+        url = '{}/{}/channels'.format(endpoints.USERS, self.user.id)
+        async with self._get_session().post(url, json=payload, headers=self.headers) as r:
+            if not is_response_successful(r):
+                log.error(request_logging_format.format(name='start_private_message', method='POST', response=r))
+                return None
+            data = await r.json(loads=self._codec.loads)
+
+        channel = PrivateChannel(id=data['id'], user=user)
+        self.connection._add_private_channel(channel)
+        return channel
+
+    async def send_message(self, destination, content, mentions=True, tts=False):
+        """|coro| Sends a message to the destination given with the content given.
+
+        The parameters are the same as :meth:`Client.send_message`.
+
+        :return: The :class:`Message` sent or None if error occurred.
+        """
+        channel_id, is_private_message = await self._resolve_destination(destination)
+
+        content = str(content)
+        url = '{base}/{id}/messages'.format(base=endpoints.CHANNELS, id=channel_id)
+        payload = {
+            'content': content,
+        }
+
+        if not is_private_message:
+            payload['mentions'] = self._resolve_mentions(content, mentions)
+
+        if tts:
+            payload['tts'] = True
+
+        async with self._get_session().post(url, json=payload, headers=self.headers) as response:
+            if not is_response_successful(response):
+                log.error(request_logging_format.format(name='send_message', method='POST', response=response))
+                return None
+            data = await response.json(loads=self._codec.loads)
+
+        channel = self.get_channel(data.get('channel_id'))
+        return Message(channel=channel, **data)
+
+    async def send_file(self, destination, filename):
+        """|coro| Sends a message to the destination given with the file given.
+
+        :return: The :class:`Message` sent or None if an error occurred.
+        """
+        channel_id, is_private_message = await self._resolve_destination(destination)
+        url = '{base}/{id}/messages'.format(base=endpoints.CHANNELS, id=channel_id)
+
+        with open(filename, 'rb') as f:
+            form = aiohttp.FormData()
+            form.add_field('file', f, filename=filename)
+            async with self._get_session().post(url, data=form, headers=self.headers) as response:
+                if not is_response_successful(response):
+                    log.error(request_logging_format.format(name='send_file', method='POST', response=response))
+                    return None
+                data = await response.json(loads=self._codec.loads)
+
+        channel = self.get_channel(data.get('channel_id'))
+        return Message(channel=channel, **data)
+
+    async def delete_message(self, message):
+        """|coro| Deletes a :class:`Message`.
+
+        :returns: True if the message was deleted successfully, False otherwise.
+        """
+        url = '{}/{}/messages/{}'.format(endpoints.CHANNELS, message.channel.id, message.id)
+        async with self._get_session().delete(url, headers=self.headers) as response:
+            log.debug(request_logging_format.format(name='delete_message', method='DELETE', response=response))
+            return is_response_successful(response)
+
+    async def edit_message(self, message, new_content, mentions=True):
+        """|coro| Edits a :class:`Message` with the new message content.
+
+        :return: The new edited message or None if an error occurred.
+        """
+        channel = message.channel
+        content = str(new_content)
+
+        url = '{}/{}/messages/{}'.format(endpoints.CHANNELS, channel.id, message.id)
+        payload = {
+            'content': content
+        }
+
+        if not channel.is_private:
+            payload['mentions'] = self._resolve_mentions(content, mentions)
+
+        async with self._get_session().patch(url, json=payload, headers=self.headers) as response:
+            if not is_response_successful(response):
+                log.error(request_logging_format.format(name='edit_message', method='PATCH', response=response))
+                return None
+            data = await response.json(loads=self._codec.loads)
+
+        return Message(channel=channel, **data)
+
+    async def logs_from(self, channel, limit=100):
+        """|coro| Obtains logs from a specified channel.
+
+        :param channel: The :class:`Channel` to obtain the logs from.
+        :param limit: The number of messages to retrieve.
+        :return: A list of :class:`Message`, empty if an error occurred.
+        """
+        url = '{}/{}/messages'.format(endpoints.CHANNELS, channel.id)
+        params = {
+            'limit': limit
+        }
+
+        async with self._get_session().get(url, params=params, headers=self.headers) as response:
+            if not is_response_successful(response):
+                log.error(request_logging_format.format(name='logs_from', method='GET', response=response))
+                return []
+            messages = await response.json(loads=self._codec.loads)
+
+        return [Message(channel=channel, **message) for message in messages]
+
+    async def change_status(self, game_id=None, idle=False):
+        """|coro| Changes the client's status. See :meth:`Client.change_status`."""
+        idle_since = None if idle == False else int(time.time() * 1000)
+        payload = {
+            'op': 3,
+            'd': {
+                'game_id': game_id,
+                'idle_since': idle_since
+            }
+        }
+
+        sent = self._codec.dumps(payload)
+        log.debug('Sending "{}" to change status'.format(sent))
+        await self.ws.send_str(sent)
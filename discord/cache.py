@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from collections import OrderedDict
+import itertools
+
+class MessageCache(object):
+    """An ordered store of :class:`Message` keyed by message ID.
+
+    Lookups, insertions and removals are all O(1). Once more than ``max_length``
+    messages are stored the oldest one is evicted. With the ``'lru'`` eviction
+    policy a message is considered new again every time it is looked up.
+
+    In the ``'channel'`` and ``'server'`` modes every channel (or server) also
+    gets its own budget of ``max_bucket_length`` messages, so a busy channel only
+    evicts its own history. ``max_length`` is still honoured as a global cap.
+    Private messages are always bucketed by channel.
+    """
+
+    def __init__(self, max_length=5000, eviction='fifo', mode='global', max_bucket_length=None):
+        if eviction not in ('fifo', 'lru'):
+            raise ValueError("eviction must be either 'fifo' or 'lru'")
+
+        if mode not in ('global', 'channel', 'server'):
+            raise ValueError("mode must be one of 'global', 'channel' or 'server'")
+
+        self.max_length = max_length
+        self.eviction = eviction
+        self.mode = mode
+        self.max_bucket_length = max_bucket_length
+        self._messages = OrderedDict()
+        # bucket key -> OrderedDict of message id -> None, oldest first
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(list(self._messages.values()))
+
+    def __reversed__(self):
+        return iter(list(reversed(self._messages.values())))
+
+    def __contains__(self, message_id):
+        return message_id in self._messages
+
+    def _bucket_key(self, message):
+        channel = message.channel
+        if channel is None:
+            return None
+        if self.mode == 'server' and not channel.is_private:
+            return channel.server.id
+        return channel.id
+
+    def _bucket_for(self, message, create=False):
+        if self.mode == 'global':
+            return None
+        key = self._bucket_key(message)
+        bucket = self._buckets.get(key)
+        if bucket is None and create:
+            bucket = self._buckets[key] = OrderedDict()
+        return bucket
+
+    def _discard_from_bucket(self, message):
+        if self.mode == 'global':
+            return
+        key = self._bucket_key(message)
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.pop(message.id, None)
+            if not bucket:
+                del self._buckets[key]
+
+    def add(self, message):
+        messages = self._messages
+        messages[message.id] = message
+        messages.move_to_end(message.id)
+
+        bucket = self._bucket_for(message, create=True)
+        if bucket is not None:
+            bucket[message.id] = None
+            bucket.move_to_end(message.id)
+            if self.max_bucket_length is not None:
+                while len(bucket) > self.max_bucket_length:
+                    oldest, _ = bucket.popitem(last=False)
+                    messages.pop(oldest, None)
+
+        if self.max_length is not None:
+            while len(messages) > self.max_length:
+                _, oldest = messages.popitem(last=False)
+                self._discard_from_bucket(oldest)
+
+    def get(self, message_id):
+        message = self._messages.get(message_id)
+        if message is not None and self.eviction == 'lru':
+            self._messages.move_to_end(message_id)
+            bucket = self._bucket_for(message)
+            if bucket is not None:
+                bucket.move_to_end(message_id)
+        return message
+
+    def replace(self, message):
+        """Replaces a cached message without changing its eviction order."""
+        if message.id in self._messages:
+            self._messages[message.id] = message
+
+    def pop(self, message_id):
+        message = self._messages.pop(message_id, None)
+        if message is not None:
+            self._discard_from_bucket(message)
+        return message
+
+    def clear(self):
+        self._messages.clear()
+        self._buckets.clear()
+
+    def bucket_length(self, key):
+        """Returns the number of messages cached for a channel or server ID."""
+        bucket = self._buckets.get(key)
+        return 0 if bucket is None else len(bucket)
+
+
+class MessageCacheView(object):
+    """A read-only, deque-like view over a :class:`MessageCache`.
+
+    Iteration goes from the oldest to the newest message. Indexing is supported
+    for compatibility with the old ``deque`` but anything other than ``[0]`` and
+    ``[-1]`` is O(n).
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    @property
+    def maxlen(self):
+        return self._cache.max_length
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __bool__(self):
+        return len(self._cache) != 0
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        return iter(self._cache)
+
+    def __reversed__(self):
+        return reversed(self._cache)
+
+    def __contains__(self, message):
+        found = self._cache._messages.get(getattr(message, 'id', None))
+        return found is not None and found is message
+
+    def __getitem__(self, index):
+        length = len(self._cache)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError('message cache index out of range')
+
+        messages = self._cache._messages.values()
+        if index < length // 2:
+            return next(itertools.islice(iter(messages), index, None))
+        return next(itertools.islice(reversed(messages), length - index - 1, None))
+
+    def get(self, message_id):
+        """Returns the cached :class:`Message` with the given ID or None if not found."""
+        return self._cache._messages.get(message_id)
+
+    def __repr__(self):
+        return '<MessageCacheView len={0} maxlen={1}>'.format(len(self), self.maxlen)
+
+
+class DictValuesView(object):
+    """A read-only, list-like view over the values of a dict keyed by ID, such as
+    :attr:`Client.servers` or :attr:`Server.members`.
+
+    Length and membership are O(1), iteration goes over a snapshot so the dict
+    can change in the meantime and indexing is O(n). Modifying the view raises
+    ``TypeError`` rather than silently changing a copy. Use ``list(view)`` to get
+    a list that can be modified.
+    """
+
+    __slots__ = ('_get_dict', '_name')
+
+    def __init__(self, get_dict, name):
+        # a callable returning the dict, so the view follows it being replaced
+        self._get_dict = get_dict
+        self._name = name
+
+    def __len__(self):
+        return len(self._get_dict())
+
+    def __bool__(self):
+        return len(self._get_dict()) != 0
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        return iter(list(self._get_dict().values()))
+
+    def __contains__(self, item):
+        found = self._get_dict().get(getattr(item, 'id', None))
+        return found is not None and found is item
+
+    def __getitem__(self, index):
+        return list(self._get_dict().values())[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, DictValuesView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def get(self, id):
+        """Returns the value with the given ID or None if not found."""
+        return self._get_dict().get(id)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('{} is read-only, use list() to get a copy that can be modified'.format(self._name))
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = _read_only
+
+    def __repr__(self):
+        return '<DictValuesView {0} len={1}>'.format(self._name, len(self))
@@ -23,10 +23,9 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 
-from copy import deepcopy
-from . import utils
-from .permissions import Permissions
-from collections import namedtuple
+from .permissions import Permissions, FrozenPermissions
+from .role import OverwrittenRole
+from collections import namedtuple, OrderedDict
 
 Overwrites = namedtuple('Overwrites', 'id allow deny type')
 
@@ -58,19 +57,26 @@ class Channel(object):
         The channel type. Usually ``'voice'`` or ``'text'``.
     .. attribute:: changed_roles
 
-        An array of :class:`Roles` that have been overridden from their default
-        values in the :attr:`Server.roles` attribute.
+        An array of :class:`OverwrittenRole`, one for every role of :attr:`Server.roles`
+        that has a permission overwrite in this channel. They are built on access and
+        behave like the :class:`Role` they wrap, with the overwrite applied to its permissions.
     .. attribute:: voice_members
 
         An array of :class:`Members` that are currently inside this voice channel.
         If :attr:`type` is not ``'voice'`` then this is always an empty array.
     """
 
+    __slots__ = ('name', 'server', 'id', 'topic', 'is_private', 'position', 'type',
+                 'voice_members', '_role_overwrites', '_member_overwrites', '_permissions_cache',
+                 '_permissions_generation')
+
     def __init__(self, **kwargs):
         self.update(**kwargs)
         self.voice_members = []
 
     def update(self, **kwargs):
+        # bumped before anything changes, see permissions_for
+        self._permissions_generation = getattr(self, '_permissions_generation', 0) + 1
         self.name = kwargs.get('name')
         self.server = kwargs.get('server')
         self.id = kwargs.get('id')
@@ -78,24 +84,30 @@ class Channel(object):
         self.is_private = False
         self.position = kwargs.get('position')
         self.type = kwargs.get('type')
-        self.changed_roles = []
-        self._permission_overwrites = []
+        # role id -> Overwrites in the order Discord sent them, and member id -> Overwrites
+        self._role_overwrites = OrderedDict()
+        self._member_overwrites = {}
+        # member id -> resolved FrozenPermissions, see permissions_for
+        self._permissions_cache = {}
         for overridden in kwargs.get('permission_overwrites', []):
-            self._permission_overwrites.append(Overwrites(**overridden))
-
-            if overridden.get('type') == 'member':
-                continue
-
-            # this is pretty inefficient due to the deep nested loops unfortunately
-            role = utils.find(lambda r: r.id == overridden['id'], self.server.roles)
-            if role is None:
-                continue
-
-            denied = overridden.get('deny', 0)
-            allowed = overridden.get('allow', 0)
-            override = deepcopy(role)
-            override.permissions.handle_overwrite(allowed, denied)
-            self.changed_roles.append(override)
+            overwrite = Overwrites(**overridden)
+            if overwrite.type == 'member':
+                self._member_overwrites[overwrite.id] = overwrite
+            else:
+                self._role_overwrites[overwrite.id] = overwrite
+
+    @property
+    def changed_roles(self):
+        if not self._role_overwrites:
+            return []
+
+        roles = dict((role.id, role) for role in self.server.roles)
+        changed = []
+        for overwrite in self._role_overwrites.values():
+            role = roles.get(overwrite.id)
+            if role is not None:
+                changed.append(OverwrittenRole(role, overwrite.allow, overwrite.deny))
+        return changed
 
     def is_default_channel(self):
         """Checks if this is the default channel for the :class:`Server` it belongs to."""
@@ -112,10 +124,35 @@ class Channel(object):
         - Member overrides
         - Whether the channel is the default channel.
 
+        The result is cached per member until the roles of the server, the roles of
+        the member or the channel change.
+
         :param member: The :class:`Member` to resolve permissions for.
-        :return: The resolved :class:`Permissions` for the :class:`Member`.
+        :return: The resolved :class:`FrozenPermissions` for the :class:`Member`.
         """
 
+        if member.id == self.server.owner.id:
+            return Permissions.ALL
+
+        if member.server is not self.server:
+            # role bits are only meaningful within the member's own server, so
+            # a member from elsewhere is resolved by role ID and not cached
+            role_bits = self.server._role_bits_for(member.roles)
+            return FrozenPermissions(self._resolve_permissions(member, role_bits))
+
+        permissions = self._permissions_cache.get(member.id)
+        if permissions is None:
+            generation = self._permissions_generation
+            permissions = FrozenPermissions(self._resolve_permissions(member, member._role_bits))
+            self._permissions_cache[member.id] = permissions
+            # the cache may have been invalidated by another thread while this
+            # was resolved, in which case the value could already be stale
+            if generation != self._permissions_generation:
+                self._permissions_cache.pop(member.id, None)
+        return permissions
+
+    def _resolve_permissions(self, member, role_bits):
+
         # The current cases can be explained as:
         # Server owner get all permissions -- no questions asked. Otherwise...
         # The @everyone role gets the first application.
@@ -132,31 +169,21 @@ class Channel(object):
         # The operation first takes into consideration the denied
         # and then the allowed.
 
-        if member.id == self.server.owner.id:
-            return Permissions.all()
-
-        default = self.server.get_default_role()
-        base = deepcopy(default.permissions)
-
-        # Apply server roles that the member has.
-        for role in member.roles:
-            base.value |= role.permissions.value
-
-        # Server-wide Manage Roles -> True for everything
-        if base.can_manage_roles:
-            base = Permissions.all()
-
-        member_role_ids = set(map(lambda r: r.id, member.roles))
+        # The @everyone role and the member's roles, with Server-wide
+        # Manage Roles -> True for everything
+        base = Permissions(self.server._server_permissions(role_bits))
 
         # Apply channel specific role permission overwrites
-        for overwrite in self._permission_overwrites:
-            if overwrite.type == 'role' and overwrite.id in member_role_ids:
-                base.handle_overwrite(allow=overwrite.allow, deny=overwrite.deny)
+        if self._role_overwrites:
+            indexed = self.server._role_bits
+            for overwrite in self._role_overwrites.values():
+                if role_bits & indexed.get(overwrite.id, 0):
+                    base.handle_overwrite(allow=overwrite.allow, deny=overwrite.deny)
 
         # Apply member specific permission overwrites
-        for overwrite in self._permission_overwrites:
-            if overwrite.type == 'member' and overwrite.id == member.id:
-                base.handle_overwrite(allow=overwrite.allow, deny=overwrite.deny)
+        overwrite = self._member_overwrites.get(member.id)
+        if overwrite is not None:
+            base.handle_overwrite(allow=overwrite.allow, deny=overwrite.deny)
 
         if base.can_manage_roles:
             # This point is essentially Channel-specific Manage Roles.
@@ -166,7 +193,9 @@ class Channel(object):
         if self.is_default_channel():
             base.can_read_messages = True
 
-        return base
+        return base.value
+
+_private_permissions = Permissions.TEXT - Permissions.mask('send_tts_messages', 'manage_messages', 'mention_everyone')
 
 class PrivateChannel(object):
     """Represents a Discord private channel.
@@ -189,7 +218,7 @@ class PrivateChannel(object):
         self.id = id
         self.is_private = True
 
-    def permissions_for(user):
+    def permissions_for(self, user):
         """Handles permission resolution for a :class:`User`.
 
         This function is there for compatibility with :class:`Channel`.
@@ -203,13 +232,9 @@ class PrivateChannel(object):
         - can_mention_everyone: There is no one to mention in a PM.
 
         :param user: The :class:`User` to check permissions for.
-        :return: A :class:`Permission` with the resolved permission value.
+        :return: A :class:`FrozenPermissions` with the resolved permission value.
         """
 
-        base = Permissions.TEXT
-        base.can_send_tts_messages = False
-        base.can_manage_messages = False
-        base.can_mention_everyone = False
-        return base
+        return _private_permissions
 
 
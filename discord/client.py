@@ -31,28 +31,66 @@ from .errors import InvalidEventName, InvalidDestination, GatewayNotFound
 from .user import User
 from .channel import Channel, PrivateChannel
 from .server import Server, Member
-from .role import Role, Permissions
+from .role import Role, OverwrittenRole, Permissions
 from .message import Message
 from . import utils
 from .invite import Invite
+from .state import ConnectionState
+from .executor import KeyedExecutor
+from .http import HTTPClient
+from .codec import get_codec
+from . import gateway
 
 import traceback
-import requests
-import json, re, time, copy
-from collections import deque
+import re, time
 import threading
 from ws4py.client import WebSocketBaseClient
+from ws4py.exc import WebSocketException
 import sys
 import logging
 import itertools
+from collections import namedtuple
 
 
 log = logging.getLogger(__name__)
 request_logging_format = '{name}: {response.request.method} {response.url} has returned {response.status_code}'
 request_success_log = '{name}: {response.url} with {json} received {data}'
 
-def _null_event(*args, **kwargs):
-    pass
+# a listener added through Client.add_listener, ``filters`` is a tuple of
+# (function that extracts an ID from the event, frozenset of wanted IDs)
+Listener = namedtuple('Listener', 'callback priority filters')
+
+def _channel_id(obj):
+    if isinstance(obj, Message):
+        return obj.channel.id if obj.channel is not None else None
+    if isinstance(obj, (Channel, PrivateChannel)):
+        return obj.id
+    return None
+
+def _server_id(obj):
+    if isinstance(obj, Message):
+        obj = obj.channel
+        if obj is None or obj.is_private:
+            return None
+    if isinstance(obj, (Channel, Member)):
+        obj = obj.server
+    if isinstance(obj, Server):
+        return obj.id
+    return None
+
+def _author_id(obj):
+    if isinstance(obj, Message):
+        return obj.author.id
+    if isinstance(obj, User):
+        return obj.id
+    return None
+
+def _listener_matches(listener, args):
+    obj = args[0] if args else None
+    for extract, wanted in listener.filters:
+        if extract(obj) not in wanted:
+            return False
+    return True
 
 def is_response_successful(response):
     """Helper function for checking if the status code is in the 200 range"""
@@ -68,21 +106,26 @@ class KeepAliveHandler(threading.Thread):
 
     def run(self):
         while not self.stop.wait(self.seconds):
-            payload = {
-                'op': 1,
-                'd': int(time.time())
-            }
+            self.socket.send(gateway.heartbeat(self.socket.codec))
 
-            msg = 'Keeping websocket alive with timestamp {0}'
-            log.debug(msg.format(payload['d']))
-            self.socket.send(json.dumps(payload, separators=(',', ':')))
+# the gateway events that the ConnectionState has a handler for
+_state_events = frozenset(name[7:].upper() for name in dir(ConnectionState) if name.startswith('handle_'))
 
 class WebSocket(WebSocketBaseClient):
-    def __init__(self, dispatch, url):
+    def __init__(self, dispatch, url, compression=None, codec=None, listening=None):
         WebSocketBaseClient.__init__(self, url,
                                      protocols=['http-only', 'chat'])
         self.dispatch = dispatch
+        # tells whether anyone listens to an event, so the raw socket
+        # events are only dispatched when they would be received
+        self.listening = listening or (lambda event: True)
+        self.codec = codec or get_codec('json')
         self.keep_alive = None
+        self._inflator = gateway.Inflator(compression)
+        # the sequence number of the last dispatch received, used to
+        # resume the session on a new connection
+        self.sequence = None
+        self.heartbeat_interval = None
 
     def opened(self):
         log.info('Opened at {}'.format(int(time.time())))
@@ -99,284 +142,56 @@ class WebSocket(WebSocketBaseClient):
         pass
 
     def send(self, payload, binary=False):
-        self.dispatch('socket_raw_send', payload, binary)
+        if self.listening('socket_raw_send'):
+            self.dispatch('socket_raw_send', payload, binary)
         WebSocketBaseClient.send(self, payload, binary)
 
     def received_message(self, msg):
-        self.dispatch('socket_raw_receive', msg)
-        response = json.loads(str(msg))
-        log.debug('WebSocket Event: {}'.format(response))
-        self.dispatch('socket_response', response)
+        if self.listening('socket_raw_receive'):
+            self.dispatch('socket_raw_receive', msg)
+        if msg.is_binary:
+            payload = self._inflator.decompress(msg.data)
+            if payload is None:
+                # wait for the rest of the payload
+                return
+        else:
+            payload = str(msg)
+
+        response = self.codec.loads(payload)
+        log.debug('WebSocket Event: %s', response)
+        if self.listening('socket_response'):
+            self.dispatch('socket_response', response)
 
         op = response.get('op')
         data = response.get('d')
 
+        if op == 9:
+            # the session could not be resumed
+            self.dispatch('socket_invalid_session')
+            return
+
         if op != 0:
-            log.info("Unhandled op {}".format(op))
+            log.info('Unhandled op %s', op)
             return # What about op 7?
 
+        sequence = response.get('s')
+        if sequence is not None:
+            self.sequence = sequence
+
         event = response.get('t')
 
-        if event == 'READY':
-            interval = data['heartbeat_interval'] / 1000.0
-            self.keep_alive = KeepAliveHandler(interval, self)
-            self.keep_alive.start()
+        if event in ('READY', 'RESUMED'):
+            self.heartbeat_interval = data.get('heartbeat_interval', self.heartbeat_interval)
+            if self.keep_alive is None and self.heartbeat_interval is not None:
+                self.keep_alive = KeepAliveHandler(self.heartbeat_interval / 1000.0, self)
+                self.keep_alive.start()
 
 
-        if event in ('READY', 'MESSAGE_CREATE', 'MESSAGE_DELETE',
-                     'MESSAGE_UPDATE', 'PRESENCE_UPDATE', 'USER_UPDATE',
-                     'CHANNEL_DELETE', 'CHANNEL_UPDATE', 'CHANNEL_CREATE',
-                     'GUILD_MEMBER_ADD', 'GUILD_MEMBER_REMOVE',
-                     'GUILD_MEMBER_UPDATE', 'GUILD_CREATE', 'GUILD_DELETE',
-                     'GUILD_ROLE_CREATE', 'GUILD_ROLE_DELETE',
-                     'GUILD_ROLE_UPDATE', 'VOICE_STATE_UPDATE'):
+        if event in _state_events:
             self.dispatch('socket_update', event, data)
 
         else:
-            log.info("Unhandled event {}".format(event))
-
-
-class ConnectionState(object):
-    def __init__(self, dispatch, **kwargs):
-        self.dispatch = dispatch
-        self.user = None
-        self.email = None
-        self.servers = []
-        self.private_channels = []
-        self.messages = deque([], maxlen=kwargs.get('max_length', 5000))
-
-    def _get_message(self, msg_id):
-        return utils.find(lambda m: m.id == msg_id, self.messages)
-
-    def _get_server(self, guild_id):
-        return utils.find(lambda g: g.id == guild_id, self.servers)
-
-    def _update_voice_state(self, server, data):
-        user_id = data.get('user_id')
-        member = utils.find(lambda m: m.id == user_id, server.members)
-        if member is not None:
-            ch_id = data.get('channel_id')
-            channel = utils.find(lambda c: c.id == ch_id, server.channels)
-            member.update_voice_state(voice_channel=channel, **data)
-        return member
-
-    def _add_server(self, guild):
-        guild['roles'] = [Role(everyone=(guild['id'] == role['id']), **role) for role in guild['roles']]
-        members = guild['members']
-        owner = guild['owner_id']
-        for i, member in enumerate(members):
-            roles = member['roles']
-            for j, roleid in enumerate(roles):
-                role = utils.find(lambda r: r.id == roleid, guild['roles'])
-                if role is not None:
-                    roles[j] = role
-            members[i] = Member(**member)
-
-            # found the member that owns the server
-            if members[i].id == owner:
-                owner = members[i]
-
-        for presence in guild['presences']:
-            user_id = presence['user']['id']
-            member = utils.find(lambda m: m.id == user_id, members)
-            if member is not None:
-                member.status = presence['status']
-                member.game_id = presence['game_id']
-
-
-        server = Server(owner=owner, **guild)
-
-        # give all the members their proper server
-        for member in server.members:
-            member.server = server
-
-        channels = [Channel(server=server, **channel)
-                    for channel in guild['channels']]
-        server.channels = channels
-        for obj in guild.get('voice_states', []):
-            self._update_voice_state(server, obj)
-        self.servers.append(server)
-
-    def handle_ready(self, data):
-        self.user = User(**data['user'])
-        guilds = data.get('guilds')
-
-        for guild in guilds:
-            self._add_server(guild)
-
-        for pm in data.get('private_channels'):
-            self.private_channels.append(PrivateChannel(id=pm['id'],
-                                         user=User(**pm['recipient'])))
-
-        # we're all ready
-        self.dispatch('ready')
-
-    def handle_message_create(self, data):
-        channel = self.get_channel(data.get('channel_id'))
-        message = Message(channel=channel, **data)
-        self.dispatch('message', message)
-        self.messages.append(message)
-
-    def handle_message_delete(self, data):
-        channel = self.get_channel(data.get('channel_id'))
-        message_id = data.get('id')
-        found = self._get_message(message_id)
-        if found is not None:
-            self.dispatch('message_delete', found)
-            self.messages.remove(found)
-
-    def handle_message_update(self, data):
-        older_message = self._get_message(data.get('id'))
-        if older_message is not None:
-            # create a copy of the new message
-            message = copy.deepcopy(older_message)
-            # update the new update
-            for attr in data:
-                if attr == 'channel_id' or attr == 'author':
-                    continue
-                value = data[attr]
-                if 'time' in attr:
-                    setattr(message, attr, utils.parse_time(value))
-                else:
-                    setattr(message, attr, value)
-            self.dispatch('message_edit', older_message, message)
-            # update the older message
-            older_message = message
-
-    def handle_presence_update(self, data):
-        server = self._get_server(data.get('guild_id'))
-        if server is not None:
-            status = data.get('status')
-            user = data['user']
-            member_id = user['id']
-            member = utils.find(lambda m: m.id == member_id, server.members)
-            if member is not None:
-                member.status = data.get('status')
-                member.game_id = data.get('game_id')
-                member.name = user.get('username', member.name)
-                member.avatar = user.get('avatar', member.avatar)
-
-                # call the event now
-                self.dispatch('status', member)
-                self.dispatch('member_update', member)
-
-    def handle_user_update(self, data):
-        self.user = User(**data)
-
-    def handle_channel_delete(self, data):
-        server =  self._get_server(data.get('guild_id'))
-        if server is not None:
-            channel_id = data.get('id')
-            channel = utils.find(lambda c: c.id == channel_id, server.channels)
-            server.channels.remove(channel)
-            self.dispatch('channel_delete', channel)
-
-    def handle_channel_update(self, data):
-        server = self._get_server(data.get('guild_id'))
-        if server is not None:
-            channel_id = data.get('id')
-            channel = utils.find(lambda c: c.id == channel_id, server.channels)
-            channel.update(server=server, **data)
-            self.dispatch('channel_update', channel)
-
-    def handle_channel_create(self, data):
-        is_private = data.get('is_private', False)
-        channel = None
-        if is_private:
-            recipient = User(**data.get('recipient'))
-            pm_id = data.get('id')
-            channel = PrivateChannel(id=pm_id, user=recipient)
-            self.private_channels.append(channel)
-        else:
-            server = self._get_server(data.get('guild_id'))
-            if server is not None:
-                channel = Channel(server=server, **data)
-                server.channels.append(channel)
-
-        self.dispatch('channel_create', channel)
-
-    def handle_guild_member_add(self, data):
-        server = self._get_server(data.get('guild_id'))
-        member = Member(server=server, deaf=False, mute=False, **data)
-        server.members.append(member)
-        self.dispatch('member_join', member)
-
-    def handle_guild_member_remove(self, data):
-        server = self._get_server(data.get('guild_id'))
-        if server is not None:
-            user_id = data['user']['id']
-            member = utils.find(lambda m: m.id == user_id, server.members)
-            server.members.remove(member)
-            self.dispatch('member_remove', member)
-
-    def handle_guild_member_update(self, data):
-        server = self._get_server(data.get('guild_id'))
-        user_id = data['user']['id']
-        member = utils.find(lambda m: m.id == user_id, server.members)
-        if member is not None:
-            user = data['user']
-            member.name = user['username']
-            member.discriminator = user['discriminator']
-            member.avatar = user['avatar']
-            member.roles = []
-            # update the roles
-            for role in server.roles:
-                if role.id in data['roles']:
-                    member.roles.append(role)
-
-            self.dispatch('member_update', member)
-
-    def handle_guild_create(self, data):
-        self._add_server(data)
-        self.dispatch('server_create', self.servers[-1])
-
-    def handle_guild_delete(self, data):
-        server = self._get_server(data.get('id'))
-        self.servers.remove(server)
-        self.dispatch('server_delete', server)
-
-    def handle_guild_role_create(self, data):
-        server = self._get_server(data.get('guild_id'))
-        role_data = data.get('role', {})
-        everyone = server.id == role_data.get('id')
-        role = Role(everyone=everyone, **role_data)
-        server.roles.append(role)
-        self.dispatch('server_role_create', server, role)
-
-    def handle_guild_role_delete(self, data):
-        server = self._get_server(data.get('guild_id'))
-        if server is not None:
-            role_id = data.get('role_id')
-            role = utils.find(lambda r: r.id == role_id, server.roles)
-            server.roles.remove(role)
-            self.dispatch('server_role_delete', server, role)
-
-    def handle_guild_role_update(self, data):
-        server = self._get_server(data.get('guild_id'))
-        if server is not None:
-            role_id = data['role']['id']
-            role = utils.find(lambda r: r.id == role_id, server.roles)
-            role.update(**data['role'])
-            self.dispatch('server_role_update', role)
-
-    def handle_voice_state_update(self, data):
-        server = self._get_server(data.get('guild_id'))
-        if server is not None:
-            updated_member = self._update_voice_state(server, data)
-            self.dispatch('voice_state_update', updated_member)
-
-    def get_channel(self, id):
-        if id is None:
-            return None
-
-        for server in self.servers:
-            for channel in server.channels:
-                if channel.id == id:
-                    return channel
-
-        for pm in self.private_channels:
-            if pm.id == id:
-                return pm
+            log.info('Unhandled event %s', event)
 
 
 class Client(object):
@@ -386,6 +201,58 @@ class Client(object):
     A number of options can be passed to the :class:`Client` via keyword arguments.
 
     :param int max_length: The maximum number of messages to store in :attr:`messages`. Defaults to 5000.
+    :param str message_eviction: How messages are evicted from :attr:`messages` once it is full. ``'fifo'``
+                                 evicts the oldest received message, ``'lru'`` evicts the message that was
+                                 least recently edited or deleted. Defaults to ``'fifo'``.
+    :param str message_cache_mode: Either ``'global'``, ``'channel'`` or ``'server'``. In the ``'channel'`` and
+                                   ``'server'`` modes each channel or server gets its own message budget so
+                                   one busy channel does not evict the history of quiet ones. ``max_length``
+                                   stays the global cap. Defaults to ``'global'``.
+    :param int max_bucket_length: The maximum number of messages to store per channel or server when
+                                  ``message_cache_mode`` is not ``'global'``. Defaults to 100.
+    :param bool lazy_members: If ``True``, server members are kept in a compact form and a :class:`Member`
+                              is only created the first time it is accessed through :attr:`Server.members`,
+                              :meth:`Server.get_member` or as a message author. This cuts the time it takes
+                              to become ready and the memory used by large servers. Defaults to ``False``.
+    :param int dispatch_workers: The number of threads that run event callbacks such as :func:`on_message`.
+                                 The cached state is still updated on the websocket thread, but a slow
+                                 callback no longer stalls the websocket. Defaults to 0, which runs the
+                                 callbacks on the websocket thread like before.
+    :param str dispatch_ordering: How callbacks are ordered when ``dispatch_workers`` is set. ``'global'`` runs
+                                  every callback in the order the events were received, on a single worker.
+                                  ``'channel'`` keeps the order within a channel (or server for member
+                                  and server events). ``'unordered'`` gives no guarantees. Defaults to ``'global'``.
+    :param int dispatch_queue_size: The number of callbacks each worker can have waiting before the websocket
+                                    thread blocks until there is room. See :attr:`dispatch_stats`. Defaults to 1000.
+    :param int http_pool_size: The maximum number of HTTP connections kept open to Discord. All REST calls
+                               share one connection pool. Defaults to 10.
+    :param http_timeout: The timeout in seconds for every REST call, either a number or a ``(connect, read)``
+                         tuple. Defaults to None, which waits forever.
+    :param int http_retries: How many times a REST call is retried when the connection could not be
+                             established. Defaults to 0.
+    :param bool http_keep_alive: Whether HTTP connections are kept open between REST calls. Defaults to ``True``.
+    :param bool ratelimit: Whether REST calls are rate limited on the client side. Calls are queued per route
+                           and per channel or server, wait when Discord reports that the route is out of
+                           requests and are retried after a 429 response. Defaults to ``True``.
+    :param int max_ratelimit_retries: How many times a REST call is retried after a 429 response. Defaults to 5.
+    :param int request_workers: The number of threads used by :meth:`send_message_nowait` and co. Defaults to 4.
+    :param int request_queue_size: The number of requests each of those threads can have waiting before the
+                                   caller blocks until there is room. Defaults to 1000.
+    :param json_codec: The JSON library used to decode the websocket events and REST responses and to encode the
+                       payloads sent over the websocket. Either the name of a library (``'orjson'``, ``'ujson'``
+                       or ``'json'``) or an object with ``loads`` and ``dumps`` functions. Defaults to None,
+                       which picks the fastest of those that is installed.
+    :param str gateway_compression: How the gateway compresses its payloads. ``'zlib'`` compresses every payload
+                                    on its own, ``'zlib-stream'`` compresses the whole connection with a single
+                                    zlib context which gives a far better ratio. Defaults to None, no compression.
+    :param float reconnect_base: The seconds to wait before the first reconnect attempt after the websocket
+                                 is closed. The wait doubles with every failed attempt. Defaults to 1.
+    :param float reconnect_cap: The maximum seconds to wait between reconnect attempts. Defaults to 60.
+    :param float reconnect_jitter: The fraction of the wait, from 0 to 1, that is randomised so that many
+                                   clients don't reconnect at the same time. Defaults to 1, which waits
+                                   anywhere between zero and the full delay.
+    :param int reconnect_max_attempts: How many reconnect attempts in a row may fail before :meth:`run` gives
+                                       up and raises the last error. Defaults to None, which retries forever.
 
     Instance attributes:
 
@@ -394,13 +261,16 @@ class Client(object):
          A :class:`User` that represents the connected client. None if not logged in.
      .. attribute:: servers
 
-         A list of :class:`Server` that the connected client has available.
+         A read-only list-like view of the :class:`Server` that the connected client has available.
+         Use ``list(client.servers)`` for a copy that can be modified.
      .. attribute:: private_channels
 
-         A list of :class:`PrivateChannel` that the connected client is participating on.
+         A read-only list-like view of the :class:`PrivateChannel` that the connected client is
+         participating on.
      .. attribute:: messages
 
-        A deque_ of :class:`Message` that the client has received from all servers and private messages.
+        A read-only deque_-like sequence of :class:`Message` that the client has received from all servers
+        and private messages, ordered from oldest to newest. ``messages.get(id)`` looks up a message by ID.
      .. attribute:: email
 
         The email used to login. This is only set if login is successful, otherwise it's None.
@@ -409,11 +279,42 @@ class Client(object):
     """
 
     def __init__(self, **kwargs):
+        # event -> (handle method, 'on_' name, listeners), filled on first dispatch
+        self._routes = {}
+        # bumped whenever the routes are dropped, see _route
+        self._routes_generation = 0
+        # 'on_' name -> list of Listener sorted by priority
+        self._listeners = {}
         self._is_logged_in = False
         self._close = False
+        self._close_event = threading.Event()
+        # the websocket URL, kept so a reconnect doesn't have to look it up again
+        self._gateway = None
         self.options = kwargs
+        self._backoff = gateway.Backoff(kwargs)
+        self._codec = get_codec(kwargs.get('json_codec'))
         self.connection = ConnectionState(self.dispatch, **kwargs)
+        self.http = HTTPClient(pool_size=kwargs.get('http_pool_size', 10),
+                               timeout=kwargs.get('http_timeout'),
+                               retries=kwargs.get('http_retries', 0),
+                               keep_alive=kwargs.get('http_keep_alive', True),
+                               ratelimit=kwargs.get('ratelimit', True),
+                               max_ratelimit_retries=kwargs.get('max_ratelimit_retries', 5),
+                               codec=self._codec)
         self.dispatch_lock = threading.RLock()
+        self._dispatch_ordering = kwargs.get('dispatch_ordering', 'global')
+        if self._dispatch_ordering not in ('global', 'channel', 'unordered'):
+            raise ValueError("dispatch_ordering must be one of 'global', 'channel' or 'unordered'")
+
+        # events whose callbacks are waiting for the outermost dispatch to finish
+        self._pending_callbacks = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._dispatch_workers = kwargs.get('dispatch_workers', 0)
+        self._request_executor = None
+        self._request_executor_lock = threading.Lock()
+        if self._dispatch_workers:
+            self._get_dispatch_executor()
         self.token = ''
 
         # the actual headers for the request...
@@ -422,31 +323,39 @@ class Client(object):
             'authorization': self.token,
         }
 
+    def _get_gateway(self):
+        if self._gateway is None:
+            gateway = self.http.get(endpoints.GATEWAY, headers=self.headers)
+            if not is_response_successful(gateway):
+                raise GatewayNotFound()
+            self._gateway = self._codec.loads(gateway.content).get('url')
+        return self._gateway
+
     def _create_websocket(self, url, reconnect=False):
         if url is None:
             raise GatewayNotFound()
         log.info('websocket gateway found')
-        self.ws = WebSocket(self.dispatch, url)
+        previous = self.ws if reconnect else None
+        compression = self.options.get('gateway_compression')
+        url = gateway.connection_url(url, compression)
+        self.ws = WebSocket(self.dispatch, url, compression=compression, codec=self._codec,
+                            listening=self._listening)
+        if previous is not None:
+            self.ws.sequence = previous.sequence
+            self.ws.heartbeat_interval = previous.heartbeat_interval
         self.ws.connect()
         log.info('websocket has connected')
 
-        if reconnect == False:
-            second_payload = {
-                'op': 2,
-                'd': {
-                    'token': self.token,
-                    'properties': {
-                        '$os': sys.platform,
-                        '$browser': 'discord.py',
-                        '$device': 'discord.py',
-                        '$referrer': '',
-                        '$referring_domain': ''
-                    },
-                    'v': 3
-                }
-            }
+        if reconnect and self.connection.session_id is not None and self.ws.sequence is not None:
+            self._resume()
+        else:
+            self._identify()
+
+    def _identify(self):
+        self.ws.send(gateway.identify(self._codec, self.token, self.options.get('gateway_compression')))
 
-            self.ws.send(json.dumps(second_payload, separators=(',', ':')))
+    def _resume(self):
+        self.ws.send(gateway.resume(self._codec, self.token, self.connection.session_id, self.ws.sequence))
 
     def _resolve_mentions(self, content, mentions):
         if isinstance(mentions, list):
@@ -470,12 +379,14 @@ class Client(object):
         if isinstance(destination, Channel) or isinstance(destination, PrivateChannel):
             return (destination.id, destination.is_private)
         elif isinstance(destination, User):
-            found = utils.find(lambda pm: pm.user == destination, self.private_channels)
+            found = self.connection._get_private_channel_by_user(destination.id)
             if found is None:
                 # Couldn't find the user, so start a PM with them first.
                 self.start_private_message(destination)
-                channel_id = self.private_channels[-1].id
-                return (channel_id, True)
+                found = self.connection._get_private_channel_by_user(destination.id)
+                if found is None:
+                    raise InvalidDestination('Could not start a private message with {0.id}'.format(destination))
+                return (found.id, True)
             else:
                 return (found.id, True)
         elif isinstance(destination, str):
@@ -503,21 +414,243 @@ class Client(object):
             return setattr(self.connection, name, value)
         else:
             object.__setattr__(self, name, value)
+            if name.startswith(('on_', 'handle_')):
+                # a listener was registered or replaced
+                self._invalidate_routes()
+
+    def _lookup(self, name):
+        # only looks at the instance and its class, a miss through
+        # __getattr__ would build an error message every time
+        if name in self.__dict__ or hasattr(type(self), name):
+            return getattr(self, name)
+        return None
+
+    def _invalidate_routes(self):
+        # called after the change, so a route built from the old listeners
+        # sees the generation move and is not kept
+        self._routes_generation += 1
+        self._routes.clear()
+
+    def _route(self, event):
+        route = self._routes.get(event)
+        if route is None:
+            generation = self._routes_generation
+            event_method = 'on_' + event
+            listeners = self._listeners.get(event_method, [])
+            callback = self._lookup(event_method)
+            if callback is not None:
+                # the listener registered through @client.event or a subclass
+                # goes first among those with the default priority
+                index = len([l for l in listeners if l.priority > 0])
+                listeners = listeners[:index] + [Listener(callback, 0, ())] + listeners[index:]
+            route = (self._lookup('handle_' + event), event_method, tuple(listeners))
+            self._routes[event] = route
+            # a listener may have been added by another thread in the meantime
+            if generation != self._routes_generation:
+                self._routes.pop(event, None)
+        return route
+
+    def _listening(self, event):
+        return len(self._route(event)[2]) != 0
+
+    def add_listener(self, func, name=None, channel=None, server=None, author=None, priority=0):
+        """Registers a function to be called for an event. Unlike :meth:`event`
+        any number of functions can listen to the same event.
+
+        The filters are checked before the listener is called, so a listener
+        that only cares about a few channels costs next to nothing for the
+        others. Each filter is an ID or a collection of IDs and is matched
+        against the first argument of the event, e.g. the :class:`Message` of
+        :func:`on_message`. Events that don't carry what a filter looks at,
+        such as :func:`on_ready`, are never passed to a listener with that filter.
+
+        Example: ::
+
+            def on_message(message):
+                print(message.content)
+
+            client.add_listener(on_message, channel='81384788765712384')
+
+        :param func: The function to call.
+        :param str name: The event to listen to, e.g. ``'on_message'``. Defaults to the name of the function.
+        :param channel: Only call the listener for this channel ID or these channel IDs.
+        :param server: Only call the listener for this server ID or these server IDs.
+        :param author: Only call the listener for messages from this user ID or these user IDs.
+                       For member and user events this is the ID of the member or user.
+        :param int priority: Listeners with a higher priority are called first. Listeners
+                             with the same priority are called in the order they were added,
+                             after the one registered through :meth:`event`. Defaults to 0.
+        :raises InvalidEventName: The name does not start with ``on_``.
+        """
+        name = name or func.__name__
+        if not name.startswith('on_'):
+            raise InvalidEventName('event name {} must start with on_'.format(name))
+
+        filters = []
+        for extract, ids in ((_channel_id, channel), (_server_id, server), (_author_id, author)):
+            if ids is None:
+                continue
+            if isinstance(ids, str):
+                ids = (ids,)
+            filters.append((extract, frozenset(ids)))
+
+        # the list is replaced rather than changed in place since a route
+        # may be built from it on another thread, and a stable sort keeps the
+        # listeners of the same priority in order
+        listeners = self._listeners.get(name, []) + [Listener(func, priority, tuple(filters))]
+        listeners.sort(key=lambda l: -l.priority)
+        self._listeners[name] = listeners
+        self._invalidate_routes()
+
+    def remove_listener(self, func, name=None):
+        """Removes a listener added through :meth:`add_listener`. Does nothing
+        if the function is not listening to the event.
+
+        :param func: The function to remove.
+        :param str name: The event it listens to. Defaults to the name of the function.
+        """
+        name = name or func.__name__
+        listeners = self._listeners.get(name)
+        if listeners is None:
+            return
+
+        for index, listener in enumerate(listeners):
+            if listener.callback == func:
+                listeners = listeners[:index] + listeners[index + 1:]
+                break
+
+        if listeners:
+            self._listeners[name] = listeners
+        else:
+            del self._listeners[name]
+        self._invalidate_routes()
+
+    def listen(self, name=None, **kwargs):
+        """A decorator that registers the function through :meth:`add_listener`.
+        Takes the same arguments, except for the function itself.
+
+        Example: ::
+
+            @client.listen(channel=channel_ids, priority=10)
+            def on_message(message):
+                print(message.content)
+        """
+        def decorator(func):
+            self.add_listener(func, name, **kwargs)
+            return func
+        return decorator
+
+    def _run_event(self, event_method, callback, *args, **kwargs):
+        try:
+            callback(*args, **kwargs)
+        except Exception as e:
+            getattr(self, 'on_error')(event_method, *args, **kwargs)
+
+    def _run_pooled_event(self, event_method, callback, *args, **kwargs):
+        # same as _run_event but the exception is raised again after on_error
+        # so that the pool counts it as failed in dispatch_stats
+        try:
+            callback(*args, **kwargs)
+        except Exception:
+            getattr(self, 'on_error')(event_method, *args, **kwargs)
+            raise
+
+    def _get_dispatch_executor(self):
+        # created again if an event arrives after run() has stopped the pool
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = KeyedExecutor(workers=self._dispatch_workers,
+                                               queue_size=self.options.get('dispatch_queue_size', 1000),
+                                               name='discord-dispatch')
+            return self._executor
+
+    def _dispatch_key(self, args):
+        if self._dispatch_ordering == 'unordered':
+            return None
+
+        if self._dispatch_ordering == 'channel' and args:
+            obj = args[0]
+            if isinstance(obj, Message) and obj.channel is not None:
+                return obj.channel.id
+            if isinstance(obj, (Channel, PrivateChannel, Server)):
+                return obj.id
+            if isinstance(obj, Member) and obj.server is not None:
+                return obj.server.id
+
+        return 0
 
     def dispatch(self, event, *args, **kwargs):
+        handler, event_method, listeners = self._routes.get(event) or self._route(event)
+        if not self._dispatch_workers:
+            with self.dispatch_lock:
+                log.debug('Dispatching event %s', event)
+                if handler is not None:
+                    handler(*args, **kwargs)
+                for listener in listeners:
+                    if not listener.filters or _listener_matches(listener, args):
+                        self._run_event(event_method, listener.callback, *args, **kwargs)
+            return
+
+        # The state is still updated on the calling thread under the lock but
+        # the callbacks are only handed to the pool once the outermost
+        # dispatch has released the lock. Otherwise a full queue would block
+        # while holding the lock and a callback that needs it could never
+        # finish to make room.
         with self.dispatch_lock:
-            log.debug("Dispatching event {}".format(event))
-            handle_method = '_'.join(('handle', event))
-            event_method = '_'.join(('on', event))
-            getattr(self, handle_method, _null_event)(*args, **kwargs)
+            log.debug('Dispatching event %s', event)
+            outermost = self._pending_callbacks is None
+            if outermost:
+                self._pending_callbacks = []
+            pending = self._pending_callbacks
+
             try:
-                getattr(self, event_method, _null_event)(*args, **kwargs)
-            except Exception as e:
-                getattr(self, 'on_error')(event_method, *args, **kwargs)
+                if handler is not None:
+                    handler(*args, **kwargs)
+                key = None
+                for listener in listeners:
+                    if not listener.filters or _listener_matches(listener, args):
+                        if key is None:
+                            key = self._dispatch_key(args)
+                        pending.append((key, event_method, listener.callback, args, kwargs))
+            finally:
+                if outermost:
+                    self._pending_callbacks = None
+
+        if outermost and pending:
+            executor = self._get_dispatch_executor()
+            for key, event_method, callback, args, kwargs in pending:
+                executor.submit(key, self._run_pooled_event, event_method, callback, *args, **kwargs)
+
+    @property
+    def dispatch_stats(self):
+        """Returns the backpressure metrics of the event callback pool as a dict or
+        None if the client was not created with ``dispatch_workers``.
+
+        The keys are ``submitted``, ``completed``, ``failed``, ``queued``, ``max_queued``,
+        ``blocked`` and ``blocked_time``.
+        """
+        if not self._dispatch_workers:
+            return None
+        return self._get_dispatch_executor().stats()
 
     def handle_socket_update(self, event, data):
-        method = '_'.join(('handle', event.lower()))
-        getattr(self.connection, method)(data)
+        self.connection.parsers[event](data)
+
+    def handle_ready(self):
+        self._backoff.reset()
+
+    def handle_resumed(self):
+        self._backoff.reset()
+
+    def handle_socket_invalid_session(self):
+        # The session is gone so the missed events can't be replayed. Start
+        # over with a fresh state and a new READY.
+        log.info('session could not be resumed, identifying again')
+        email = self.connection.email
+        self.connection = ConnectionState(self.dispatch, **self.options)
+        self.connection.email = email
+        self.ws.sequence = None
+        self._identify()
 
     def run(self):
         """Runs the client and allows it to receive messages and events."""
@@ -525,15 +658,36 @@ class Client(object):
         self.ws.run()
 
         # The WebSocket is guaranteed to be terminated after ws.run().
-        # Check if we wanted it to close and reconnect if not.
+        # Check if we wanted it to close and reconnect if not. The cached
+        # state is kept and the session is resumed, so only the events
+        # missed while disconnected are received again.
         while not self._close:
-            gateway = requests.get(endpoints.GATEWAY, headers=self.headers)
-            if gateway.status_code != 200:
-                raise GatewayNotFound()
-            self.connection = ConnectionState(self.dispatch, **self.options)
-            self._create_websocket(gateway.json().get('url'), reconnect=False)
+            delay = self._backoff.next_delay()
+            if delay is None:
+                break
+
+            self.dispatch('reconnect_attempt', self._backoff.attempts, delay)
+            if self._close_event.wait(delay):
+                break
+
+            try:
+                self._create_websocket(self._get_gateway(), reconnect=True)
+            except (GatewayNotFound, OSError, WebSocketException) as e:
+                self._backoff.failed(e)
+                # the gateway may have moved, look it up again next time
+                self._gateway = None
+                continue
+
+            self._backoff.succeeded()
             self.ws.run()
 
+        # the callbacks already queued still run, a later run() or a late
+        # event starts a new pool
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
         log.info('Client exiting')
 
     @property
@@ -561,11 +715,11 @@ class Client(object):
             'recipient_id': user.id
         }
 
-        r = requests.post('{}/{}/channels'.format(endpoints.USERS, self.user.id), json=payload, headers=self.headers)
+        r = self.http.post('{}/{}/channels'.format(endpoints.USERS, self.user.id), json=payload, headers=self.headers)
         if is_response_successful(r):
-            data = r.json()
+            data = self._codec.loads(r.content)
             log.debug(request_success_log.format(name='start_private_message', response=r, json=payload, data=data))
-            self.private_channels.append(PrivateChannel(id=data['id'], user=user))
+            self.connection._add_private_channel(PrivateChannel(id=data['id'], user=user))
         else:
             log.error(request_logging_format.format(name='start_private_message', response=r))
 
@@ -606,9 +760,9 @@ class Client(object):
         if tts:
             payload['tts'] = True
 
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = self.http.post(url, json=payload, headers=self.headers)
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='send_message', response=response, json=payload, data=data))
             channel = self.get_channel(data.get('channel_id'))
             message = Message(channel=channel, **data)
@@ -637,10 +791,10 @@ class Client(object):
             files = {
                 'file': (filename, f)
             }
-            response = requests.post(url, files=files, headers=self.headers)
+            response = self.http.post(url, files=files, headers=self.headers)
 
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='send_file', response=response, json=response.text, data=filename))
             channel = self.get_channel(data.get('channel_id'))
             message = Message(channel=channel, **data)
@@ -659,7 +813,7 @@ class Client(object):
         """
 
         url = '{}/{}/messages/{}'.format(endpoints.CHANNELS, message.channel.id, message.id)
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url, headers=self.headers)
         log.debug(request_logging_format.format(name='delete_message', response=response))
         return is_response_successful(response)
 
@@ -685,14 +839,89 @@ class Client(object):
         if not channel.is_private:
             payload['mentions'] = self._resolve_mentions(content, mentions)
 
-        response = requests.patch(url, headers=self.headers, json=payload)
+        response = self.http.patch(url, headers=self.headers, json=payload)
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='edit_message', response=response, json=payload, data=data))
             return Message(channel=channel, **data)
         else:
             log.error(request_logging_format.format(name='edit_message', response=response))
 
+    def _get_request_executor(self):
+        with self._request_executor_lock:
+            if self._request_executor is None:
+                self._request_executor = KeyedExecutor(workers=self.options.get('request_workers', 4),
+                                                       queue_size=self.options.get('request_queue_size', 1000),
+                                                       name='discord-request')
+            return self._request_executor
+
+    def _destination_key(self, destination):
+        # private messages are keyed by the user rather than the channel, so
+        # that sends to a user keep their order before and after the private
+        # channel exists and whether the User or the PrivateChannel is given
+        if isinstance(destination, PrivateChannel):
+            return destination.user.id
+        if isinstance(destination, User):
+            return destination.id
+        return getattr(destination, 'id', destination)
+
+    def send_message_nowait(self, destination, content, mentions=True, tts=False):
+        """A non-blocking version of :meth:`send_message`.
+
+        The request is sent from a pool of worker threads so this returns immediately,
+        which makes it safe to call from inside an event. Requests to the same channel
+        are sent one after the other on the same worker, in the order they were made,
+        so many replies to one channel neither reorder nor tie up the whole pool.
+
+        The size of the pool and of its queue can be set with the ``request_workers``
+        and ``request_queue_size`` options of :class:`Client`.
+
+        :return: A :class:`concurrent.futures.Future` whose result is what
+                 :meth:`send_message` would have returned.
+        """
+        key = self._destination_key(destination)
+        return self._get_request_executor().submit(key, self.send_message, destination, content,
+                                                   mentions=mentions, tts=tts)
+
+    def send_file_nowait(self, destination, filename):
+        """A non-blocking version of :meth:`send_file`. See :meth:`send_message_nowait`.
+
+        :return: A :class:`concurrent.futures.Future` whose result is what :meth:`send_file`
+                 would have returned.
+        """
+        key = self._destination_key(destination)
+        return self._get_request_executor().submit(key, self.send_file, destination, filename)
+
+    def delete_message_nowait(self, message):
+        """A non-blocking version of :meth:`delete_message`. See :meth:`send_message_nowait`.
+
+        :return: A :class:`concurrent.futures.Future` whose result is what :meth:`delete_message`
+                 would have returned.
+        """
+        key = self._destination_key(message.channel)
+        return self._get_request_executor().submit(key, self.delete_message, message)
+
+    def edit_message_nowait(self, message, new_content, mentions=True):
+        """A non-blocking version of :meth:`edit_message`. See :meth:`send_message_nowait`.
+
+        :return: A :class:`concurrent.futures.Future` whose result is what :meth:`edit_message`
+                 would have returned.
+        """
+        key = self._destination_key(message.channel)
+        return self._get_request_executor().submit(key, self.edit_message, message,
+                                                   new_content, mentions=mentions)
+
+    @property
+    def request_stats(self):
+        """Returns the backpressure metrics of the pool used by :meth:`send_message_nowait`
+        and co. as a dict or None if none of them has been called yet. The keys are the same
+        as :attr:`dispatch_stats`.
+        """
+        executor = self._request_executor
+        if executor is None:
+            return None
+        return executor.stats()
+
     def login(self, email, password):
         """Logs in the user with the following credentials and initialises
         the connection to Discord.
@@ -709,20 +938,17 @@ class Client(object):
             'password': password
         }
 
-        r = requests.post(endpoints.LOGIN, json=payload)
+        r = self.http.post(endpoints.LOGIN, json=payload)
 
         if is_response_successful(r):
             log.info('logging in returned status code {}'.format(r.status_code))
             self.email = email
 
-            body = r.json()
+            body = self._codec.loads(r.content)
             self.token = body['token']
             self.headers['authorization'] = self.token
 
-            gateway = requests.get(endpoints.GATEWAY, headers=self.headers)
-            if not is_response_successful(gateway):
-                raise GatewayNotFound()
-            self._create_websocket(gateway.json().get('url'), reconnect=False)
+            self._create_websocket(self._get_gateway(), reconnect=False)
             self._is_logged_in = True
         else:
             log.error(request_logging_format.format(name='login', response=r))
@@ -745,31 +971,39 @@ class Client(object):
             'invite': self._resolve_invite(invite)
         }
 
-        r = requests.post(endpoints.REGISTER, json=payload)
+        r = self.http.post(endpoints.REGISTER, json=payload)
 
         if r.status_code == 201:
             log.info('register returned status code 200')
             self.email = ''
 
-            body = r.json()
+            body = self._codec.loads(r.content)
             self.token = body['token']
             self.headers['authorization'] = self.token
 
-            gateway = requests.get(endpoints.GATEWAY, headers=self.headers)
-            if gateway.status_code != 200:
-                raise GatewayNotFound()
-            self._create_websocket(gateway.json().get('url'), reconnect=False)
+            self._create_websocket(self._get_gateway(), reconnect=False)
             self._is_logged_in = True
         else:
             log.error(request_logging_format.format(name='register',
                                                     response=r))
 
     def logout(self):
-        """Logs out of Discord and closes all connections."""
-        response = requests.post(endpoints.LOGOUT)
+        """Logs out of Discord and closes all connections.
+
+        Requests already queued by :meth:`send_message_nowait` and co. are sent
+        before logging out, so this blocks until they are done.
+        """
+        with self._request_executor_lock:
+            executor, self._request_executor = self._request_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+        response = self.http.post(endpoints.LOGOUT)
         self._close = True
+        self._close_event.set()
         self.ws.close()
         self._is_logged_in = False
+        self.http.close()
         log.debug(request_logging_format.format(name='logout', response=response))
 
     def logs_from(self, channel, limit=100):
@@ -793,9 +1027,9 @@ class Client(object):
         params = {
             'limit': limit
         }
-        response = requests.get(url, params=params, headers=self.headers)
+        response = self.http.get(url, params=params, headers=self.headers)
         if is_response_successful(response):
-            messages = response.json()
+            messages = self._codec.loads(response.content)
             log.info('logs_from: {0.url} was successful'.format(response))
             for message in messages:
                 yield Message(channel=channel, **message)
@@ -806,6 +1040,7 @@ class Client(object):
         """A decorator that registers an event to listen to.
 
         You can find more info about the events on the :ref:`documentation below <discord-api-events>`.
+        This replaces the previous handler of the event, use :meth:`add_listener` to have more than one.
 
         Example: ::
 
@@ -829,7 +1064,7 @@ class Client(object):
         """
 
         url = '{}/{}'.format(endpoints.CHANNELS, channel.id)
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='delete_channel'))
         return is_response_successful(response)
 
@@ -844,7 +1079,7 @@ class Client(object):
         """
 
         url = '{base}/{server}/members/{user}'.format(base=endpoints.SERVERS, server=server.id, user=user.id)
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='kick'))
         return is_response_successful(response)
 
@@ -859,7 +1094,7 @@ class Client(object):
         """
 
         url = '{base}/{server}/bans/{user}'.format(base=endpoints.SERVERS, server=server.id, user=user.id)
-        response = requests.put(url, headers=self.headers)
+        response = self.http.put(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='ban'))
         return is_response_successful(response)
 
@@ -874,7 +1109,7 @@ class Client(object):
         """
 
         url = '{base}/{server}/bans/{user}'.format(base=endpoints.SERVERS, server=server.id, user=user.id)
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='unban'))
         return is_response_successful(response)
 
@@ -899,10 +1134,10 @@ class Client(object):
         }
 
         url = '{0}/@me'.format(endpoints.USERS)
-        response = requests.patch(url, headers=self.headers, json=payload)
+        response = self.http.patch(url, headers=self.headers, json=payload)
 
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='edit_profile', response=response, json=payload, data=data))
             self.token = data['token']
             self.email = data['email']
@@ -934,9 +1169,9 @@ class Client(object):
             'position': options.get('position', channel.position)
         }
 
-        response = requests.patch(url, headers=self.headers, json=payload)
+        response = self.http.patch(url, headers=self.headers, json=payload)
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='edit_channel', response=response, json=payload, data=data))
             channel.update(server=channel.server, **data)
             return True
@@ -961,9 +1196,9 @@ class Client(object):
         }
 
         url = '{0}/{1.id}/channels'.format(endpoints.SERVERS, server)
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.http.post(url, headers=self.headers, json=payload)
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='create_channel', response=response, data=data, json=payload))
             channel = Channel(server=server, **data)
             # We don't append it to server.channels because CHANNEL_CREATE handles it for us.
@@ -979,7 +1214,7 @@ class Client(object):
         """
 
         url = '{0}/{1.id}'.format(endpoints.SERVERS, server)
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='leave_server'))
         return is_response_successful(response)
 
@@ -1004,13 +1239,13 @@ class Client(object):
         }
 
         url = '{0}/{1.id}/invites'.format(endpoints.CHANNELS, destination)
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.http.post(url, headers=self.headers, json=payload)
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='create_invite', json=payload, response=response, data=data))
             data['server'] = self.connection._get_server(data['guild']['id'])
             channel_id = data['channel']['id']
-            data['channel'] = utils.find(lambda ch: ch.id == channel_id, data['server'].channels)
+            data['channel'] = self.connection.get_channel(channel_id)
             return Invite(**data)
         else:
             log.debug(request_logging_format.format(response=response, name='create_invite'))
@@ -1030,7 +1265,7 @@ class Client(object):
             return False
 
         url = '{0}/invite/{1}'.format(endpoints.API_BASE, destination)
-        response = requests.post(url, headers=self.headers)
+        response = self.http.post(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='accept_invite'))
         return is_response_successful(response)
 
@@ -1069,11 +1304,12 @@ class Client(object):
             'hoist': fields.get('hoist', role.hoist)
         }
 
-        response = requests.patch(url, json=payload, headers=self.headers)
+        response = self.http.patch(url, json=payload, headers=self.headers)
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             log.debug(request_success_log.format(name='edit_role', json=payload, response=response, data=data))
             role.update(**data)
+            server._invalidate_permissions()
             return True
 
         log.debug(request_logging_format.format(response=response, name='edit_role'))
@@ -1090,7 +1326,7 @@ class Client(object):
         """
 
         url = '{0}/{1.id}/roles/{2.id}'.format(endpoints.SERVERS, server, role)
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='delete_role'))
         return is_response_successful(response)
 
@@ -1112,7 +1348,7 @@ class Client(object):
             'roles': new_roles
         }
 
-        response = requests.patch(url, headers=self.headers, json=payload)
+        response = self.http.patch(url, headers=self.headers, json=payload)
         log.debug(request_logging_format.format(response=response, name='add_roles'))
         if is_response_successful(response):
             member.roles = list(itertools.chain(member.roles, roles))
@@ -1141,13 +1377,10 @@ class Client(object):
             'roles': new_roles
         }
 
-        response = requests.patch(url, headers=self.headers, json=payload)
+        response = self.http.patch(url, headers=self.headers, json=payload)
         log.debug(request_logging_format.format(response=response, name='remove_roles'))
         if is_response_successful(response):
-            member.roles = []
-            for role in member.server.roles:
-                if role.id in new_roles:
-                    member.roles.append(role)
+            member.roles = new_roles
 
             return True
 
@@ -1174,7 +1407,7 @@ class Client(object):
             'roles': [role.id for role in roles]
         }
 
-        response = requests.patch(url, headers=self.headers, json=payload)
+        response = self.http.patch(url, headers=self.headers, json=payload)
         log.debug(request_logging_format.format(response=response, name='replace_roles'))
         if is_response_successful(response):
             member.roles = list(roles)
@@ -1191,13 +1424,15 @@ class Client(object):
         """
 
         url = '{0}/{1.id}/roles'.format(endpoints.SERVERS, server)
-        response = requests.post(url, headers=self.headers)
+        response = self.http.post(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='create_role'))
 
         if is_response_successful(response):
-            data = response.json()
+            data = self._codec.loads(response.content)
             everyone = server.id == data.get('id')
-            role = Role(everyone=everyone, **data)
+            # added right away so it can be given to members before the
+            # gateway sends GUILD_ROLE_CREATE
+            role = server._add_role(Role(everyone=everyone, **data))
             if self.edit_role(server, role, **fields):
                 # we have to call edit because you can't pass a payload to the
                 # http request currently.
@@ -1210,7 +1445,8 @@ class Client(object):
         specified :class:`Channel`.
 
         The ``target`` parameter should either be a :class:`Member` or a
-        :class:`Role` that belongs to the channel's server.
+        :class:`Role` that belongs to the channel's server. An entry of
+        :attr:`Channel.changed_roles` can be passed as well.
 
         You must have the proper permissions to do this.
 
@@ -1229,6 +1465,9 @@ class Client(object):
         :return: ``True`` if setting is successful, ``False`` otherwise.
         """
 
+        if isinstance(target, OverwrittenRole):
+            target = target.role
+
         url = '{0}/{1.id}/permissions/{2.id}'.format(endpoints.CHANNELS, channel, target)
 
         allow = Permissions.none() if allow is None else allow
@@ -1253,7 +1492,7 @@ class Client(object):
         else:
             raise TypeError('target parameter must be either discord.Member or discord.Role')
 
-        response = requests.put(url, json=payload, headers=self.headers)
+        response = self.http.put(url, json=payload, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='set_channel_permissions'))
         return is_response_successful(response)
 
@@ -1270,8 +1509,11 @@ class Client(object):
         :return: ``True`` if deletion is successful, ``False`` otherwise.
         """
 
+        if isinstance(target, OverwrittenRole):
+            target = target.role
+
         url = '{0}/{1.id}/permissions/{2.id}'.format(endpoints.CHANNELS, channel, target)
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url, headers=self.headers)
         log.debug(request_logging_format.format(response=response, name='delete_channel_permissions'))
         return is_response_successful(response)
 
@@ -1300,7 +1542,7 @@ class Client(object):
             }
         }
 
-        sent = json.dumps(payload)
+        sent = self._codec.dumps(payload)
         log.debug('Sending "{}" to change status'.format(sent))
         self.ws.send(sent)
 
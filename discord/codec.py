@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import json
+
+class JSONCodec(object):
+    """The functions used to encode and decode the JSON sent to and received
+    from Discord, over both the websocket and the REST API.
+
+    .. attribute:: name
+
+        The name of the library, e.g. ``'json'`` or ``'orjson'``.
+    .. attribute:: loads
+
+        A function that takes a ``str`` or UTF-8 encoded ``bytes`` and returns the decoded object.
+    .. attribute:: dumps
+
+        A function that takes an object and returns a compact ``str``.
+    """
+
+    __slots__ = ('name', 'loads', 'dumps')
+
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return '<JSONCodec name={0.name!r}>'.format(self)
+
+def _stdlib_codec():
+    def loads(s):
+        # json.loads only takes bytes on Python 3.6+
+        if isinstance(s, (bytes, bytearray)):
+            s = s.decode('utf-8')
+        return json.loads(s)
+
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+    return JSONCodec('json', loads, dumps)
+
+def _orjson_codec():
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    return JSONCodec('orjson', orjson.loads, dumps)
+
+def _ujson_codec():
+    import ujson
+
+    def dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=False)
+
+    return JSONCodec('ujson', ujson.loads, dumps)
+
+# fastest first
+_codecs = (
+    ('orjson', _orjson_codec),
+    ('ujson', _ujson_codec),
+    ('json', _stdlib_codec)
+)
+
+def get_codec(codec=None):
+    """Returns the :class:`JSONCodec` to use.
+
+    :param codec: None to pick the fastest library that is installed, the
+                  name of a library (``'orjson'``, ``'ujson'`` or ``'json'``)
+                  or an object with ``loads`` and ``dumps`` functions, which
+                  is returned as is.
+    :raises ImportError: The named library is not installed.
+    :raises ValueError: The name is not one of the supported libraries.
+    """
+    if codec is None:
+        for name, factory in _codecs:
+            try:
+                return factory()
+            except ImportError:
+                continue
+
+    if isinstance(codec, str):
+        for name, factory in _codecs:
+            if name == codec:
+                return factory()
+        raise ValueError('unknown JSON codec {!r}'.format(codec))
+
+    return codec
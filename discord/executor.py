@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from concurrent.futures import Future
+import threading
+import logging
+import queue
+import time
+
+log = logging.getLogger(__name__)
+
+_shutdown_sentinel = object()
+
+class KeyedExecutor(object):
+    """A pool of worker threads where work submitted with the same key is
+    always run by the same worker, in submission order.
+
+    Work submitted with a key of ``None`` has no ordering guarantees and goes
+    to the worker with the shortest queue.
+
+    Every worker has a bounded queue. When it is full :meth:`submit` blocks
+    the calling thread until there is room again, which pushes back on
+    whoever is producing the work. How often and for how long that happened
+    is available through :meth:`stats`. Work submitted from one of the
+    workers themselves is run inline instead of blocking, since waiting on a
+    queue that only the current thread drains would never finish.
+    """
+
+    def __init__(self, workers=4, queue_size=1000, name='discord-worker'):
+        if workers < 1:
+            raise ValueError('workers must be at least 1')
+
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._blocked = 0
+        self._blocked_time = 0.0
+        self._max_queued = 0
+
+        for index, work_queue in enumerate(self._queues):
+            thread = threading.Thread(target=self._worker, args=(work_queue,),
+                                      name='{}-{}'.format(name, index))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self, work_queue):
+        while True:
+            item = work_queue.get()
+            if item is _shutdown_sentinel:
+                return
+
+            self._run(item)
+
+    def _run(self, item):
+        future, func, args, kwargs = item
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._failed += 1
+            future.set_exception(e)
+        else:
+            with self._lock:
+                self._completed += 1
+            future.set_result(result)
+
+    def _queue_for(self, key):
+        if key is None:
+            return min(self._queues, key=lambda q: q.qsize())
+        return self._queues[hash(key) % len(self._queues)]
+
+    def submit(self, key, func, *args, **kwargs):
+        """Schedules ``func(*args, **kwargs)`` to run on the worker that owns ``key``.
+
+        :return: A :class:`concurrent.futures.Future` for the result.
+        """
+        if self._shutdown:
+            raise RuntimeError('cannot submit work after shutdown')
+
+        future = Future()
+        item = (future, func, args, kwargs)
+        work_queue = self._queue_for(key)
+
+        with self._lock:
+            self._submitted += 1
+
+        try:
+            work_queue.put_nowait(item)
+        except queue.Full:
+            if threading.current_thread() in self._threads:
+                self._run(item)
+                return future
+
+            start = time.time()
+            log.debug('worker queue is full, waiting for room')
+            work_queue.put(item)
+            with self._lock:
+                self._blocked += 1
+                self._blocked_time += time.time() - start
+
+        with self._lock:
+            self._max_queued = max(self._max_queued, work_queue.qsize())
+        return future
+
+    def stats(self):
+        """Returns a dict with the current backpressure metrics.
+
+        The keys are ``submitted``, ``completed``, ``failed``, ``queued``
+        (currently waiting), ``max_queued`` (the deepest a single worker queue
+        has been), ``blocked`` (how many submissions had to wait for room) and
+        ``blocked_time`` (the total seconds spent waiting).
+        """
+        with self._lock:
+            return {
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'queued': sum(q.qsize() for q in self._queues),
+                'max_queued': self._max_queued,
+                'blocked': self._blocked,
+                'blocked_time': self._blocked_time
+            }
+
+    def shutdown(self, wait=True):
+        """Stops the workers once the work already submitted is done."""
+        if self._shutdown:
+            return
+
+        self._shutdown = True
+        for work_queue in self._queues:
+            work_queue.put(_shutdown_sentinel)
+
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
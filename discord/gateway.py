@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# The parts of the gateway protocol shared by Client and AsyncClient. Nothing
+# in here does any I/O, so it works the same for ws4py and aiohttp.
+
+from . import utils
+
+import logging
+import time
+import zlib
+import sys
+
+log = logging.getLogger(__name__)
+
+# every complete payload of a zlib-stream connection ends with this flush marker
+ZLIB_SUFFIX = b'\x00\x00\xff\xff'
+
+COMPRESSION_MODES = (None, 'zlib', 'zlib-stream')
+
+def connection_url(url, compression):
+    """Returns the URL to connect to for the ``gateway_compression`` option.
+
+    :raises ValueError: The compression mode is not supported.
+    """
+    if compression not in COMPRESSION_MODES:
+        raise ValueError("gateway_compression must be one of None, 'zlib' or 'zlib-stream'")
+    if compression == 'zlib-stream':
+        url = '{}{}compress=zlib-stream'.format(url, '&' if '?' in url else '?')
+    return url
+
+class Inflator(object):
+    """Turns the binary messages of one connection back into JSON text.
+
+    With ``'zlib-stream'`` the whole connection shares one compression context
+    and a payload may be split over several messages, so every connection
+    needs a new Inflator. Otherwise every binary message is a complete zlib
+    payload of its own.
+    """
+
+    def __init__(self, compression=None):
+        self._inflator = zlib.decompressobj() if compression == 'zlib-stream' else None
+        self._buffer = bytearray()
+
+    def decompress(self, data):
+        """Returns the decompressed payload, or None if more messages are needed."""
+        if self._inflator is None:
+            return zlib.decompress(data).decode('utf-8')
+
+        self._buffer.extend(data)
+        if len(data) < 4 or data[-4:] != ZLIB_SUFFIX:
+            # wait for the rest of the payload
+            return None
+
+        data = self._inflator.decompress(self._buffer)
+        self._buffer = bytearray()
+        return data.decode('utf-8')
+
+def heartbeat(codec):
+    """Returns the encoded heartbeat (op 1) payload."""
+    payload = {
+        'op': 1,
+        'd': int(time.time())
+    }
+
+    log.debug('Keeping websocket alive with timestamp %s', payload['d'])
+    return codec.dumps(payload)
+
+def identify(codec, token, compression=None):
+    """Returns the encoded IDENTIFY (op 2) payload."""
+    payload = {
+        'op': 2,
+        'd': {
+            'token': token,
+            'properties': {
+                '$os': sys.platform,
+                '$browser': 'discord.py',
+                '$device': 'discord.py',
+                '$referrer': '',
+                '$referring_domain': ''
+            },
+            'v': 3
+        }
+    }
+
+    if compression == 'zlib':
+        payload['d']['compress'] = True
+
+    return codec.dumps(payload)
+
+def resume(codec, token, session_id, sequence):
+    """Returns the encoded RESUME (op 6) payload."""
+    payload = {
+        'op': 6,
+        'd': {
+            'token': token,
+            'session_id': session_id,
+            'seq': sequence
+        }
+    }
+
+    log.info('resuming session {} at sequence {}'.format(session_id, sequence))
+    return codec.dumps(payload)
+
+class Backoff(object):
+    """Keeps track of the reconnect attempts made in a row.
+
+    It reads the ``reconnect_base``, ``reconnect_cap``, ``reconnect_jitter``
+    and ``reconnect_max_attempts`` client options. The client waits for the
+    delay returned by :meth:`next_delay` before every attempt and reports the
+    outcome through :meth:`failed` or :meth:`succeeded`.
+    """
+
+    def __init__(self, options):
+        self.base = options.get('reconnect_base', 1.0)
+        self.cap = options.get('reconnect_cap', 60.0)
+        self.jitter = options.get('reconnect_jitter', 1.0)
+        self.max_attempts = options.get('reconnect_max_attempts')
+        self.attempts = 0
+        self.last_error = None
+
+    def reset(self):
+        """Called once a session is ready again, the next delay starts from scratch."""
+        self.attempts = 0
+
+    def next_delay(self):
+        """Starts a new attempt and returns the seconds to wait before it.
+
+        :return: The delay, or None when the client should give up.
+        :raises Exception: The error of the last attempt when giving up after it failed.
+        """
+        self.attempts += 1
+        if self.max_attempts is not None and self.attempts > self.max_attempts:
+            log.error('giving up after {} reconnect attempts'.format(self.max_attempts))
+            if self.last_error is not None:
+                raise self.last_error
+            return None
+
+        delay = utils._backoff_delay(self.attempts, self.base, self.cap, self.jitter)
+        log.info('reconnect attempt {} in {:.2f} seconds'.format(self.attempts, delay))
+        return delay
+
+    def failed(self, error):
+        log.warning('reconnect attempt {} failed: {!r}'.format(self.attempts, error))
+        self.last_error = error
+
+    def succeeded(self):
+        self.last_error = None
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from .codec import get_codec
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import urlsplit
+import threading
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# the path segments whose ID is the "major parameter" of a route. Routes
+# under different channels or servers are rate limited separately.
+_major_parameters = ('channels', 'guilds')
+
+def _bucket_key(method, url):
+    """Turns a request into its rate limit bucket, e.g. a DELETE to
+    ``/api/channels/1234/messages/5678`` becomes
+    ``DELETE channels/1234/messages/{id}``."""
+    parts = urlsplit(url).path.strip('/').split('/')
+    if parts and parts[0] == 'api':
+        parts = parts[1:]
+
+    major = False
+    for index, part in enumerate(parts):
+        if part.isdigit():
+            if not major and index > 0 and parts[index - 1] in _major_parameters:
+                major = True
+            else:
+                parts[index] = '{id}'
+
+    return '{} {}'.format(method, '/'.join(parts))
+
+class _Bucket(object):
+    def __init__(self):
+        # only one request per bucket is in flight at a time, the others
+        # wait here in line.
+        self.lock = threading.Lock()
+        self.remaining = None
+        self.reset_at = 0.0
+
+    def delay(self):
+        if self.remaining == 0:
+            return max(0.0, self.reset_at - time.time())
+        return 0.0
+
+    def update(self, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is not None:
+            self.remaining = int(remaining)
+
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        reset = headers.get('X-RateLimit-Reset')
+        if reset_after is not None:
+            self.reset_at = time.time() + float(reset_after)
+        elif reset is not None:
+            self.reset_at = float(reset)
+
+class HTTPClient(object):
+    """Sends every REST request of a :class:`Client` through a single
+    :class:`requests.Session` so that connections are pooled and kept alive
+    instead of paying for a new TCP and TLS handshake per call.
+
+    Requests are also rate limited per route. Every route (and its channel
+    or server ID) gets a bucket whose requests are sent one at a time. The
+    ``X-RateLimit-*`` headers of the responses tell the bucket when it has
+    run out of requests, in which case the next request waits for the bucket
+    to reset. A 429 response is retried after the delay Discord asks for.
+
+    :param int pool_size: The maximum number of connections kept open per host.
+    :param timeout: The default timeout in seconds for every request, either a
+                    number or a ``(connect, read)`` tuple. None waits forever.
+    :param retries: How many times to retry a request whose connection could
+                    not be established. Can also be a ``urllib3`` ``Retry`` object.
+    :param bool keep_alive: If ``False``, connections are closed after every request.
+    :param bool ratelimit: If ``False``, requests are sent as soon as they are made and
+                           429 responses are returned as is.
+    :param int max_ratelimit_retries: How many times a request is retried after a 429.
+    :param codec: The :class:`JSONCodec` used to decode the body of a 429. Defaults to the standard library.
+    """
+
+    def __init__(self, pool_size=10, timeout=None, retries=0, keep_alive=True, ratelimit=True, max_ratelimit_retries=5, codec=None):
+        self.codec = codec or get_codec('json')
+        self.timeout = timeout
+        self.ratelimit = ratelimit
+        self.max_ratelimit_retries = max_ratelimit_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        # cleared while a global rate limit is in effect
+        self._global_over = threading.Event()
+        self._global_over.set()
+
+    def _get_bucket(self, key):
+        with self._buckets_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+            return bucket
+
+    def _retry_after(self, response):
+        # both the body and the header give the delay in milliseconds
+        try:
+            data = self.codec.loads(response.content)
+        except ValueError:
+            data = {}
+
+        retry_after = data.get('retry_after', response.headers.get('Retry-After', 1000))
+        is_global = data.get('global', False) or response.headers.get('X-RateLimit-Global') == 'true'
+        return float(retry_after) / 1000.0, is_global
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if not self.ratelimit:
+            return self.session.request(method, url, **kwargs)
+
+        key = _bucket_key(method, url)
+        bucket = self._get_bucket(key)
+        with bucket.lock:
+            for tries in range(self.max_ratelimit_retries + 1):
+                self._global_over.wait()
+                delay = bucket.delay()
+                if delay:
+                    log.debug('bucket {} is exhausted, waiting {:.2f} seconds'.format(key, delay))
+                    time.sleep(delay)
+
+                response = self.session.request(method, url, **kwargs)
+                bucket.update(response.headers)
+                if response.status_code != 429 or tries == self.max_ratelimit_retries:
+                    return response
+
+                retry_after, is_global = self._retry_after(response)
+                log.warning('{} {} was rate limited, retrying in {:.2f} seconds'.format(method, url, retry_after))
+                if is_global:
+                    self._global_over.clear()
+                    time.sleep(retry_after)
+                    self._global_over.set()
+                else:
+                    time.sleep(retry_after)
+
+                # files have been read by the previous attempt
+                for value in (kwargs.get('files') or {}).values():
+                    f = value[1] if isinstance(value, tuple) else value
+                    if hasattr(f, 'seek'):
+                        f.seek(0)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.session.close()
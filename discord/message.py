@@ -72,6 +72,9 @@ class Message(object):
         A list of attachments given to a message.
     """
 
+    __slots__ = ('edited_timestamp', 'timestamp', 'tts', 'content', 'mention_everyone',
+                 'embeds', 'id', 'channel', 'author', 'mentions', 'attachments')
+
     def __init__(self, **kwargs):
         # at the moment, the timestamps seem to be naive so they have no time zone and operate on UTC time.
         # we can use this to our advantage to use strptime instead of a complicated parsing routine.
@@ -94,7 +97,7 @@ class Message(object):
         assert self.channel is not None
 
         if not self.channel.is_private:
-            found = utils.find(lambda m: m.id == self.author.id, self.channel.server.members)
+            found = self.channel.server.get_member(self.author.id)
             if found is not None:
                 self.author = found
 
@@ -24,21 +24,65 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 
+from collections import OrderedDict
+
+# the name of every permission (without the ``can_`` prefix) and its bit
+_flags = OrderedDict((name, 1 << bit) for name, bit in (
+    ('create_instant_invite', 0),
+    ('ban_members', 1),
+    ('kick_members', 2),
+    ('manage_roles', 3),
+    ('manage_channels', 4),
+    ('manage_server', 5),
+    ('read_messages', 10),
+    ('send_messages', 11),
+    ('send_tts_messages', 12),
+    ('manage_messages', 13),
+    ('embed_links', 14),
+    ('attach_files', 15),
+    ('read_message_history', 16),
+    ('mention_everyone', 17),
+    ('connect', 20),
+    ('speak', 21),
+    ('mute_members', 22),
+    ('deafen_members', 23),
+    ('move_members', 24),
+    ('use_voice_activation', 25)
+))
+
+def _mask(permissions):
+    value = 0
+    for permission in permissions:
+        if isinstance(permission, str):
+            try:
+                value |= _flags[permission[4:] if permission.startswith('can_') else permission]
+            except KeyError:
+                raise ValueError('unknown permission {!r}'.format(permission))
+        else:
+            value |= getattr(permission, 'value', permission)
+    return value
+
 def create_permission_masks(cls):
-    cls.NONE = cls(0)
-    cls.ALL = cls(0b00000011111100111111110000111111)
-    cls.ALL_CHANNEL = cls(0b00000011111100111111110000011001)
-    cls.GENERAL = cls(0b00000000000000000000000000111111)
-    cls.TEXT = cls(0b00000000000000111111110000000000)
-    cls.VOICE = cls(0b00000011111100000000000000000000)
+    cls.NONE = FrozenPermissions(0)
+    cls.ALL = FrozenPermissions(0b00000011111100111111110000111111)
+    cls.ALL_CHANNEL = FrozenPermissions(0b00000011111100111111110000011001)
+    cls.GENERAL = FrozenPermissions(0b00000000000000000000000000111111)
+    cls.TEXT = FrozenPermissions(0b00000000000000111111110000000000)
+    cls.VOICE = FrozenPermissions(0b00000011111100000000000000000000)
     return cls
 
-@create_permission_masks
 class Permissions(object):
     """Wraps up the Discord permission value.
 
     Class attributes:
 
+    The masks below are :class:`FrozenPermissions` and cannot be modified.
+    Use e.g. :meth:`text` to get a copy that can be edited.
+
+    .. attribute:: FLAGS
+
+        An ordered ``dict`` of the name of every permission, without the ``can_``
+        prefix (e.g. ``'read_messages'``), to its bit.
     .. attribute:: NONE
 
         A :class:`Permission` with all permissions set to False.
@@ -77,9 +121,79 @@ class Permissions(object):
     were regular bools. This allows you to edit permissions.
     """
 
+    __slots__ = ('value',)
+
+    FLAGS = _flags
+
     def __init__(self, permissions=0, **kwargs):
         self.value = permissions
 
+    def __repr__(self):
+        return '<{0.__class__.__name__} value={0.value:#x}>'.format(self)
+
+    @classmethod
+    def mask(cls, *permissions):
+        """Returns the raw value of the given permissions OR'd together. Each of
+        them can be a :class:`Permissions`, a raw value or the name of a
+        permission, e.g. ``'read_messages'`` or ``'can_read_messages'``.
+
+        Computing the mask once and passing it to :meth:`has_all` is the fastest
+        way to check the same permissions over and over.
+
+        :raises ValueError: A name is not a known permission.
+        """
+        return _mask(permissions)
+
+    def has_all(self, *permissions):
+        """Returns True if every one of the given permissions is set. They are
+        given in the same way as :meth:`mask`."""
+        value = _mask(permissions)
+        return self.value & value == value
+
+    def has_any(self, *permissions):
+        """Returns True if at least one of the given permissions is set. They
+        are given in the same way as :meth:`mask`."""
+        return self.value & _mask(permissions) != 0
+
+    def union(self, *others):
+        """Returns a new :class:`Permissions` with the permissions of this one
+        and all of the others set."""
+        return self.__class__(self.value | _mask(others))
+
+    def intersection(self, *others):
+        """Returns a new :class:`Permissions` with only the permissions that
+        are set in this one and all of the others."""
+        value = self.value
+        for other in others:
+            value &= getattr(other, 'value', other)
+        return self.__class__(value)
+
+    def difference(self, *others):
+        """Returns a new :class:`Permissions` with the permissions of this one
+        that are not set in any of the others."""
+        return self.__class__(self.value & ~_mask(others))
+
+    def overwritten(self, allow, deny):
+        """Returns a new :class:`Permissions` of the same type with the ``deny``
+        permissions unset and then the ``allow`` permissions set. Unlike
+        :meth:`handle_overwrite` this one is left unchanged."""
+        allow = getattr(allow, 'value', allow)
+        deny = getattr(deny, 'value', deny)
+        return self.__class__((self.value & ~deny) | allow)
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def frozen(self):
+        """Returns a :class:`FrozenPermissions` with the same value."""
+        return FrozenPermissions(self.value)
+
     @classmethod
     def none(cls):
         """A factory method that creates a :class:`Permission` with all
@@ -334,3 +448,76 @@ class Permissions(object):
         self._set(25, value)
 
     # 6 unused
+
+
+class FrozenPermissions(Permissions):
+    """An immutable and hashable :class:`Permissions`.
+
+    This is what :meth:`Channel.permissions_for` returns and what the class
+    masks such as :attr:`Permissions.TEXT` are. The common values are
+    interned, so creating one that already exists returns the same instance.
+    Setting a permission raises ``TypeError`` -- use :meth:`mutable` to get a
+    :class:`Permissions` that can be edited.
+
+    Two of them are equal and hash the same if they have the same value. They
+    are never equal to a mutable :class:`Permissions`, which compares by
+    identity. The set operations and :meth:`overwritten` return a new
+    :class:`FrozenPermissions`, while :meth:`handle_overwrite` raises
+    ``TypeError`` like setting a permission does.
+    """
+
+    __slots__ = ()
+
+    # value -> instance, capped so that arbitrary values can't grow it forever
+    _interned = {}
+    _max_interned = 4096
+
+    def __new__(cls, permissions=0, **kwargs):
+        self = cls._interned.get(permissions)
+        if self is None:
+            permissions = getattr(permissions, 'value', permissions)
+            self = cls._interned.get(permissions)
+            if self is not None:
+                return self
+            self = object.__new__(cls)
+            object.__setattr__(self, 'value', permissions)
+            if len(cls._interned) < cls._max_interned:
+                cls._interned[permissions] = self
+        return self
+
+    def __init__(self, permissions=0, **kwargs):
+        pass
+
+    def __setattr__(self, name, value):
+        raise TypeError('FrozenPermissions cannot be modified, use mutable() to get a copy that can')
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenPermissions):
+            return self.value == other.value
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, FrozenPermissions):
+            return self.value != other.value
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __reduce__(self):
+        return (self.__class__, (self.value,))
+
+    def _set(self, index, value):
+        raise TypeError('FrozenPermissions cannot be modified, use mutable() to get a copy that can')
+
+    def handle_overwrite(self, allow, deny):
+        raise TypeError('FrozenPermissions cannot be modified, use overwritten() to get a new value')
+
+    def frozen(self):
+        return self
+
+    def mutable(self):
+        """Returns a :class:`Permissions` with the same value that can be edited."""
+        return Permissions(self.value)
+
+create_permission_masks(Permissions)
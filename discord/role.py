@@ -49,6 +49,8 @@ class Colour(object):
         The raw integer colour value.
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -218,6 +220,8 @@ class Role(object):
         such as Twitch.
     """
 
+    __slots__ = ('id', 'name', 'permissions', 'position', 'colour', 'hoist', 'managed', '_is_everyone')
+
     def __init__(self, **kwargs):
         self.update(**kwargs)
 
@@ -229,9 +233,59 @@ class Role(object):
         self.colour = Colour(kwargs.get('color', 0))
         self.hoist = kwargs.get('hoist', False)
         self.managed = kwargs.get('managed', False)
-        self.color = self.colour
         self._is_everyone = kwargs.get('everyone', False)
 
+    @property
+    def color(self):
+        return self.colour
+
+    @color.setter
+    def color(self, value):
+        self.colour = value
+
     def is_everyone(self):
         """Checks if the role is the @everyone role."""
         return self.position == -1
+
+class OverwrittenRole(object):
+    """A view of a :class:`Role` in a specific :class:`Channel`, with the
+    permission overwrite of the channel applied to it.
+
+    Nothing is copied, every attribute other than :attr:`permissions` is read from
+    the underlying role so the view always reflects the role's current state.
+
+    Instance attributes:
+
+    .. attribute:: role
+
+        The :class:`Role` that is overwritten.
+    .. attribute:: allow
+
+        The raw value of the permissions that the overwrite allows.
+    .. attribute:: deny
+
+        The raw value of the permissions that the overwrite denies.
+    """
+
+    __slots__ = ('role', 'allow', 'deny')
+
+    def __init__(self, role, allow, deny):
+        self.role = role
+        self.allow = allow
+        self.deny = deny
+
+    def __getattr__(self, name):
+        # copy and pickle look up special methods before the slots are set
+        if name == 'role' or name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.role, name)
+
+    def __reduce__(self):
+        return (self.__class__, (self.role, self.allow, self.deny))
+
+    @property
+    def permissions(self):
+        """A :class:`Permissions` with the role's permissions after the overwrite."""
+        permissions = Permissions(self.role.permissions.value)
+        permissions.handle_overwrite(self.allow, self.deny)
+        return permissions
@@ -25,7 +25,17 @@ DEALINGS IN THE SOFTWARE.
 """
 
 from .user import User
-from .utils import parse_time
+from .permissions import Permissions, FrozenPermissions
+from .utils import _parse_time_cached
+from .cache import DictValuesView
+from collections import namedtuple
+from array import array
+import itertools
+import threading
+
+# The compact form a member is kept in until it is first accessed when the
+# client is created with ``lazy_members=True``.
+LazyMember = namedtuple('LazyMember', 'username discriminator avatar joined_at role_bits deaf mute status game_id')
 
 class Member(User):
     """Represents a Discord member to a :class:`Server`.
@@ -56,7 +66,11 @@ class Member(User):
         is not currently in a voice channel.
     .. attribute:: roles
 
-        An array of :class:`Role` that the member belongs to.
+        An array of :class:`Role` that the member belongs to, in the order of
+        :attr:`Server.roles` rather than the order Discord sent them in. The member only
+        keeps the bits of its roles in the server's role index (see :meth:`has_role`) and
+        a new list is returned on every access, so assign a new list to change the roles
+        rather than modifying it.
     .. attribute:: joined_at
 
         A datetime object that specifies the date and time in UTC that the member joined the server for
@@ -72,17 +86,66 @@ class Member(User):
         The :class:`Server` that the member belongs to.
     """
 
+    __slots__ = ('deaf', 'mute', 'self_mute', 'self_deaf', 'is_afk', 'voice_channel',
+                 '_role_bits', '_detached_roles', 'joined_at', 'status', 'game_id', '_server')
+
     def __init__(self, deaf, joined_at, user, roles, mute, **kwargs):
         super(Member, self).__init__(**user)
         self.deaf = deaf
         self.mute = mute
-        self.joined_at = parse_time(joined_at)
-        self.roles = roles
+        self.joined_at = _parse_time_cached(joined_at)
         self.status = 'offline'
         self.game_id = kwargs.get('game_id', None)
+        # the roles are kept as they are until the member has a server to index them
+        self._role_bits = 0
+        self._detached_roles = list(roles)
         self.server = kwargs.get('server', None)
         self.update_voice_state(mute=mute, deaf=deaf)
 
+    @property
+    def server(self):
+        return self._server
+
+    @server.setter
+    def server(self, value):
+        roles = self._detached_roles
+        if roles is None:
+            roles = self._server._roles_from_bits(self._role_bits)
+
+        self._server = value
+        if value is None:
+            self._detached_roles = roles
+            self._role_bits = 0
+        else:
+            self._detached_roles = None
+            self._role_bits = value._role_bits_for(roles)
+
+    @property
+    def roles(self):
+        if self._detached_roles is not None:
+            return list(self._detached_roles)
+        return self._server._roles_from_bits(self._role_bits)
+
+    @roles.setter
+    def roles(self, value):
+        if self._server is None:
+            self._detached_roles = list(value)
+        else:
+            self._role_bits = self._server._role_bits_for(value)
+            self._server._invalidate_permissions(self.id)
+
+    def has_role(self, role):
+        """Checks if the member has a role.
+
+        :param role: The :class:`Role` or its ID.
+        :return: True if the member has the role, False otherwise.
+        """
+        role_id = getattr(role, 'id', role)
+        if self._detached_roles is not None:
+            return any(r.id == role_id for r in self._detached_roles)
+        bit = self._server._role_bits.get(role_id)
+        return bit is not None and self._role_bits & bit != 0
+
     def update_voice_state(self, **kwargs):
         self.self_mute = kwargs.get('self_mute', False)
         self.self_deaf = kwargs.get('self_deaf', False)
@@ -101,6 +164,89 @@ class Member(User):
                 old_channel.voice_members.remove(self)
 
 
+class PermissionMatrix(object):
+    """The resolved permissions of every member of a :class:`Server` in every
+    channel, as returned by :meth:`Server.permissions_matrix`.
+
+    Members with the same roles always have the same permissions unless they
+    own the server or have a member overwrite, so the values are only stored
+    once per role combination and channel. Queries take either a
+    :class:`Permissions` or its raw value and check that *all* of its
+    permissions are granted. ::
+
+        matrix = server.permissions_matrix()
+        readers = matrix.members_with(channel, Permissions.mask('read_messages'))
+
+    .. attribute:: channels
+
+        The list of :class:`Channel` the matrix covers.
+    .. attribute:: member_ids
+
+        The list of member IDs the matrix covers.
+    """
+
+    def __init__(self, channels, member_ids, member_groups, values, exceptions):
+        self.channels = channels
+        self.member_ids = member_ids
+        # member index -> index of its role combination
+        self._member_groups = member_groups
+        # channel index -> array of the value for each role combination
+        self._values = values
+        # channel index -> {member index: value} for members with an overwrite
+        self._exceptions = exceptions
+        self._channel_index = dict((channel.id, index) for index, channel in enumerate(channels))
+        self._member_index = dict((member_id, index) for index, member_id in enumerate(member_ids))
+
+    def _value(self, channel_index, member_index):
+        value = self._exceptions[channel_index].get(member_index)
+        if value is None:
+            value = self._values[channel_index][self._member_groups[member_index]]
+        return value
+
+    def get(self, channel, member):
+        """Returns the :class:`FrozenPermissions` of a member in a channel. Both can
+        also be given by ID. Raises ``KeyError`` if either is not in the matrix."""
+        channel_index = self._channel_index[getattr(channel, 'id', channel)]
+        member_index = self._member_index[getattr(member, 'id', member)]
+        return FrozenPermissions(self._value(channel_index, member_index))
+
+    def has(self, channel, member, permissions):
+        """Checks if a member has all of the given permissions in a channel."""
+        mask = getattr(permissions, 'value', permissions)
+        return self.get(channel, member).value & mask == mask
+
+    def members_with(self, channel, permissions):
+        """Returns the IDs of the members that have all of the given permissions in a channel."""
+        mask = getattr(permissions, 'value', permissions)
+        channel_index = self._channel_index[getattr(channel, 'id', channel)]
+        allowed = [value & mask == mask for value in self._values[channel_index]]
+        result = list(itertools.compress(self.member_ids, map(allowed.__getitem__, self._member_groups)))
+
+        # members with an overwrite might differ from the rest of their group
+        removed = set()
+        for member_index, value in self._exceptions[channel_index].items():
+            if value & mask == mask:
+                if not allowed[self._member_groups[member_index]]:
+                    result.append(self.member_ids[member_index])
+            elif allowed[self._member_groups[member_index]]:
+                removed.add(self.member_ids[member_index])
+
+        if removed:
+            result = [member_id for member_id in result if member_id not in removed]
+        return result
+
+    def count(self, channel, permissions):
+        """Returns how many members have all of the given permissions in a channel."""
+        return len(self.members_with(channel, permissions))
+
+    def channels_for(self, member, permissions):
+        """Returns the channels in which a member has all of the given permissions."""
+        mask = getattr(permissions, 'value', permissions)
+        member_index = self._member_index[getattr(member, 'id', member)]
+        return [channel for index, channel in enumerate(self.channels)
+                if self._value(index, member_index) & mask == mask]
+
+
 class Server(object):
     """Represents a Discord server.
 
@@ -123,10 +269,12 @@ class Server(object):
         The channel ID for the AFK channel. None if it doesn't exist.
     .. attribute:: members
 
-        An array of :class:`Member` that are currently on the server.
+        A read-only list-like view of the :class:`Member` that are currently on the server.
+        Prefer :meth:`get_member` to look up a member by ID.
     .. attribute:: channels
 
-        An array of :class:`Channel` that are currently on the server.
+        A read-only list-like view of the :class:`Channel` that are currently on the server.
+        Prefer :meth:`get_channel` to look up a channel by ID.
     .. attribute:: icon
 
         The server's icon.
@@ -139,18 +287,358 @@ class Server(object):
     """
 
     def __init__(self, **kwargs):
+        self._members = {}
+        # user id -> LazyMember for members that have not been created yet
+        self._lazy_members = {}
+        # held while members move from _lazy_members to _members, as dispatch
+        # workers can look members up while the gateway thread adds them
+        self._members_lock = threading.RLock()
+        self._channels = {}
+        # the channel index of the client's state, see Client.get_channel
+        self._channel_index = None
+        self._default_role = None
+        # role id -> its bit in the members' role bitsets, and the role at
+        # each bit. Bits of deleted roles are never handed out again.
+        self._role_bits = {}
+        self._indexed_roles = []
+        # role bitset -> tuple of its roles
+        self._role_sets = {}
+        # role bitset -> server wide permission value, see Channel.permissions_for
+        self._base_permissions = {}
+        # bumped before the roles or their permissions change so that values
+        # resolved concurrently on other threads are not cached
+        self._permissions_generation = 0
         self.name = kwargs.get('name')
         self.roles = kwargs.get('roles')
         self.region = kwargs.get('region')
         self.afk_timeout = kwargs.get('afk_timeout')
         self.afk_channel_id = kwargs.get('afk_channel_id')
-        self.members = kwargs.get('members')
         self.icon = kwargs.get('icon')
         self.id = kwargs.get('id')
         self.owner = kwargs.get('owner')
 
+        for member in kwargs.get('members', []):
+            self._add_member(member)
+
+    @property
+    def roles(self):
+        return self._roles
+
+    @roles.setter
+    def roles(self, value):
+        self._permissions_generation += 1
+        self._roles = value
+        value = value or ()
+        kept = set(role.id for role in value)
+        for index, role in enumerate(self._indexed_roles):
+            if role is not None and role.id not in kept:
+                del self._role_bits[role.id]
+                self._indexed_roles[index] = None
+        for role in value:
+            bit = self._role_bits.get(role.id)
+            if bit is None:
+                self._role_bits[role.id] = 1 << len(self._indexed_roles)
+                self._indexed_roles.append(role)
+            else:
+                self._indexed_roles[bit.bit_length() - 1] = role
+        self._role_sets = {}
+        self._invalidate_permissions()
+
+    def _add_role(self, role):
+        # returns the role the server ends up with, create_role adds the role
+        # before the gateway announces it, in which case the first one stays
+        bit = self._role_bits.get(role.id)
+        if bit is not None:
+            return self._indexed_roles[bit.bit_length() - 1]
+
+        self._roles.append(role)
+        self._role_bits[role.id] = 1 << len(self._indexed_roles)
+        self._indexed_roles.append(role)
+        return role
+
+    def _remove_role(self, role):
+        self._permissions_generation += 1
+        self._roles.remove(role)
+        bit = self._role_bits.pop(role.id, None)
+        if bit is not None:
+            self._indexed_roles[bit.bit_length() - 1] = None
+            self._role_sets = {}
+        self._invalidate_permissions()
+
+    def _role_bits_for(self, roles):
+        # roles can be given as Role or by ID, roles not in the server are ignored
+        bits = 0
+        role_bits = self._role_bits
+        for role in roles:
+            bits |= role_bits.get(getattr(role, 'id', role), 0)
+        return bits
+
+    def _roles_from_bits(self, bits):
+        return list(self._role_tuple(bits))
+
+    def _server_permissions(self, bits):
+        # the @everyone role and the roles of the bitset OR'd together, shared
+        # by all the members with the same roles
+        value = self._base_permissions.get(bits)
+        if value is None:
+            generation = self._permissions_generation
+            default = self.get_default_role()
+            value = default.permissions.value if default is not None else 0
+            for role in self._role_tuple(bits):
+                value |= role.permissions.value
+
+            # Server-wide Manage Roles -> True for everything
+            if value & Permissions.FLAGS['manage_roles']:
+                value = Permissions.ALL.value
+            self._base_permissions[bits] = value
+            if generation != self._permissions_generation:
+                self._base_permissions.pop(bits, None)
+        return value
+
+    def _role_tuple(self, bits):
+        roles = self._role_sets.get(bits)
+        if roles is None:
+            generation = self._permissions_generation
+            roles = []
+            index = 0
+            remaining = bits
+            while remaining:
+                if remaining & 1 and self._indexed_roles[index] is not None:
+                    roles.append(self._indexed_roles[index])
+                remaining >>= 1
+                index += 1
+            roles = self._role_sets[bits] = tuple(roles)
+            if generation != self._permissions_generation:
+                self._role_sets.pop(bits, None)
+        return roles
+
+    def __getstate__(self):
+        # the lock can't be copied or pickled, a copy gets its own
+        state = self.__dict__.copy()
+        del state['_members_lock']
+        # nor is a copy part of the client's channel index
+        state['_channel_index'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._members_lock = threading.RLock()
+
+    def _all_members(self):
+        if self._lazy_members:
+            self._materialise_all_members()
+        return self._members
+
+    @property
+    def members(self):
+        return DictValuesView(self._all_members, 'members')
+
+    @members.setter
+    def members(self, value):
+        value = list(value)
+        with self._members_lock:
+            self._members = {}
+            self._lazy_members = {}
+            for member in value:
+                self._add_member(member)
+
+    @property
+    def channels(self):
+        return DictValuesView(lambda: self._channels, 'channels')
+
+    @channels.setter
+    def channels(self, value):
+        value = list(value)
+        for channel in list(self._channels.values()):
+            self._remove_channel(channel)
+        for channel in value:
+            self._add_channel(channel)
+
+    def _add_member(self, member):
+        with self._members_lock:
+            self._members[member.id] = member
+            self._lazy_members.pop(member.id, None)
+
+    def _remove_member(self, member):
+        with self._members_lock:
+            self._members.pop(member.id, None)
+            self._lazy_members.pop(member.id, None)
+        self._invalidate_permissions(member.id)
+
+    def _materialise_member(self, user_id, lazy):
+        user = {
+            'username': lazy.username,
+            'id': user_id,
+            'discriminator': lazy.discriminator,
+            'avatar': lazy.avatar
+        }
+        member = Member(deaf=lazy.deaf, mute=lazy.mute, joined_at=lazy.joined_at, user=user,
+                        roles=(), game_id=lazy.game_id, server=self)
+        member._role_bits = lazy.role_bits
+        member.status = lazy.status
+        # the member is visible in _members before it leaves _lazy_members
+        self._members[user_id] = member
+        del self._lazy_members[user_id]
+        return member
+
+    def _materialise_all_members(self):
+        with self._members_lock:
+            for user_id, lazy in list(self._lazy_members.items()):
+                self._materialise_member(user_id, lazy)
+
+    def _invalidate_permissions(self, member_id=None):
+        # drops the permissions cached by the channels, either for a single
+        # member or for everyone when the roles themselves changed
+        # the generations are bumped first, see Channel.permissions_for
+        if member_id is None:
+            self._permissions_generation += 1
+            self._default_role = None
+            self._base_permissions = {}
+            for channel in self._channels.values():
+                channel._permissions_generation += 1
+                channel._permissions_cache.clear()
+        else:
+            for channel in self._channels.values():
+                channel._permissions_generation += 1
+                channel._permissions_cache.pop(member_id, None)
+
+    def _add_channel(self, channel):
+        self._channels[channel.id] = channel
+        if self._channel_index is not None:
+            self._channel_index[channel.id] = channel
+
+    def _remove_channel(self, channel):
+        self._channels.pop(channel.id, None)
+        if self._channel_index is not None:
+            self._channel_index.pop(channel.id, None)
+
+    def get_member(self, user_id):
+        """Returns the :class:`Member` with the given ID. If not found, returns None."""
+        member = self._members.get(user_id)
+        if member is None and self._lazy_members:
+            with self._members_lock:
+                # another thread may have created it in the meantime
+                member = self._members.get(user_id)
+                lazy = self._lazy_members.get(user_id)
+                if member is None and lazy is not None:
+                    member = self._materialise_member(user_id, lazy)
+        return member
+
+    def members_with_role(self, role):
+        """Returns the members that have a role.
+
+        This only checks a bit of every member, and members that are not
+        loaded yet are only created if they have the role.
+
+        :param role: The :class:`Role` or its ID.
+        :return: A list of :class:`Member`.
+        """
+        bit = self._role_bits.get(getattr(role, 'id', role), 0)
+        if not bit:
+            return []
+
+        with self._members_lock:
+            result = [member for member in self._members.values() if member._role_bits & bit]
+            if self._lazy_members:
+                matching = [user_id for user_id, lazy in self._lazy_members.items() if lazy.role_bits & bit]
+                result.extend(map(self.get_member, matching))
+        return result
+
+    def get_channel(self, channel_id):
+        """Returns the :class:`Channel` with the given ID. If not found, returns None."""
+        return self._channels.get(channel_id)
+
+    def permissions_matrix(self, channels=None):
+        """Resolves the permissions of every member in every channel at once, with
+        the same rules as :meth:`Channel.permissions_for`.
+
+        This is far cheaper than calling :meth:`Channel.permissions_for` for every
+        pair since members are grouped by their roles and each channel is only
+        resolved once per group. Lazy members are not materialised.
+
+        :param channels: The channels to resolve. Defaults to all of them.
+        :return: A :class:`PermissionMatrix`.
+        """
+        channels = list(self._channels.values()) if channels is None else list(channels)
+        owner_id = getattr(self.owner, 'id', self.owner)
+
+        # every distinct role bitset becomes a group, the owner gets its own
+        groups = {}
+        member_ids = []
+        member_groups = array('L')
+        everything = Permissions.ALL.value
+
+        def add(member_id, role_bits):
+            key = None if member_id == owner_id else role_bits
+            index = groups.get(key)
+            if index is None:
+                index = groups[key] = len(groups)
+            member_ids.append(member_id)
+            member_groups.append(index)
+
+        with self._members_lock:
+            for member_id, member in self._members.items():
+                add(member_id, member._role_bits)
+            for member_id, lazy in self._lazy_members.items():
+                add(member_id, lazy.role_bits)
+
+        manage_roles = Permissions.FLAGS['manage_roles']
+        read_messages = Permissions.FLAGS['read_messages']
+        all_channel = Permissions.ALL_CHANNEL.value
+
+        group_keys = sorted(groups, key=groups.get)
+        bases = [everything if key is None else self._server_permissions(key) for key in group_keys]
+
+        member_index = dict((member_id, index) for index, member_id in enumerate(member_ids))
+        values = []
+        exceptions = []
+        for channel_index, channel in enumerate(channels):
+            role_overwrites = [(self._role_bits.get(overwrite.id, 0), overwrite.allow, overwrite.deny)
+                               for overwrite in channel._role_overwrites.values()]
+            is_default = channel.is_default_channel()
+            resolved = array('L')
+            before_member = []
+            for key, base in zip(group_keys, bases):
+                if key is None:
+                    resolved.append(everything)
+                    before_member.append(None)
+                    continue
+                for bit, allow, deny in role_overwrites:
+                    if key & bit:
+                        base = (base & ~deny) | allow
+                before_member.append(base)
+                if base & manage_roles:
+                    base |= all_channel
+                if is_default:
+                    base |= read_messages
+                resolved.append(base)
+            values.append(resolved)
+            overwritten = {}
+            exceptions.append(overwritten)
+
+            for member_id, overwrite in channel._member_overwrites.items():
+                index = member_index.get(member_id)
+                if index is None:
+                    continue
+                base = before_member[member_groups[index]]
+                if base is None:
+                    continue
+                base = (base & ~overwrite.deny) | overwrite.allow
+                if base & manage_roles:
+                    base |= all_channel
+                if is_default:
+                    base |= read_messages
+                overwritten[index] = base
+
+        return PermissionMatrix(channels, member_ids, member_groups, values, exceptions)
+
     def get_default_role(self):
         """Gets the @everyone role that all members have by default."""
-        for role in self.roles:
-            if role.is_everyone():
-                return role
+        role = self._default_role
+        if role is None:
+            for role in self.roles:
+                if role.is_everyone():
+                    self._default_role = role
+                    return role
+            return None
+        return role
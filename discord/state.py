@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from .user import User
+from .channel import Channel, PrivateChannel
+from .server import Server, Member, LazyMember
+from .role import Role
+from .message import Message
+from .cache import MessageCache, MessageCacheView, DictValuesView
+from . import utils
+
+import copy
+import sys
+
+class ConnectionState(object):
+    def __init__(self, dispatch, **kwargs):
+        self.dispatch = dispatch
+        self.lazy_members = kwargs.get('lazy_members', False)
+        self.user = None
+        self.email = None
+        self.session_id = None
+        self._servers = {}
+        self._private_channels = {}
+        # extra dict to look up private channels by user id
+        self._private_channels_by_user = {}
+        # every server and private channel, keyed by channel id
+        self._channels = {}
+        self._messages = MessageCache(max_length=kwargs.get('max_length', 5000),
+                                      eviction=kwargs.get('message_eviction', 'fifo'),
+                                      mode=kwargs.get('message_cache_mode', 'global'),
+                                      max_bucket_length=kwargs.get('max_bucket_length', 100))
+        self._messages_view = MessageCacheView(self._messages)
+        self._servers_view = DictValuesView(lambda: self._servers, 'servers')
+        self._private_channels_view = DictValuesView(lambda: self._private_channels, 'private_channels')
+        # gateway event name -> handler, e.g. 'MESSAGE_CREATE' -> self.handle_message_create
+        self.parsers = dict((name[7:].upper(), getattr(self, name))
+                            for name in dir(self) if name.startswith('handle_'))
+
+    @property
+    def messages(self):
+        return self._messages_view
+
+    @messages.setter
+    def messages(self, value):
+        self._messages.clear()
+        self._messages.max_length = getattr(value, 'maxlen', self._messages.max_length)
+        for message in value:
+            self._messages.add(message)
+
+    @property
+    def servers(self):
+        return self._servers_view
+
+    @servers.setter
+    def servers(self, value):
+        value = list(value)
+        for server in list(self._servers.values()):
+            self._remove_server_from_index(server)
+        for server in value:
+            self._add_server_to_index(server)
+
+    @property
+    def private_channels(self):
+        return self._private_channels_view
+
+    @private_channels.setter
+    def private_channels(self, value):
+        value = list(value)
+        for channel_id in self._private_channels:
+            self._channels.pop(channel_id, None)
+        self._private_channels = {}
+        self._private_channels_by_user = {}
+        for channel in value:
+            self._add_private_channel(channel)
+
+    def _add_server_to_index(self, server):
+        self._servers[server.id] = server
+        # from now on the server keeps its channels in the index itself
+        server._channel_index = self._channels
+        for channel in server.channels:
+            self._channels[channel.id] = channel
+
+    def _remove_server_from_index(self, server):
+        self._servers.pop(server.id, None)
+        server._channel_index = None
+        for channel in server.channels:
+            self._channels.pop(channel.id, None)
+
+    def _add_channel(self, server, channel):
+        server._add_channel(channel)
+
+    def _remove_channel(self, server, channel):
+        server._remove_channel(channel)
+
+    def _add_private_channel(self, channel):
+        self._private_channels[channel.id] = channel
+        self._channels[channel.id] = channel
+        self._private_channels_by_user[channel.user.id] = channel
+
+    def _get_private_channel_by_user(self, user_id):
+        return self._private_channels_by_user.get(user_id)
+
+    def _get_message(self, msg_id):
+        return self._messages.get(msg_id)
+
+    def _get_server(self, guild_id):
+        return self._servers.get(guild_id)
+
+    def _update_voice_state(self, server, data):
+        user_id = data.get('user_id')
+        member = server.get_member(user_id)
+        if member is not None:
+            ch_id = data.get('channel_id')
+            channel = server.get_channel(ch_id)
+            member.update_voice_state(voice_channel=channel, **data)
+        return member
+
+    def _add_server(self, guild):
+        # everything here is resolved through dicts keyed by ID so that
+        # loading a server is linear in the number of members, roles and
+        # presences rather than their product.
+        guild['roles'] = [Role(everyone=(guild['id'] == data['id']), **data) for data in guild['roles']]
+
+        # the server comes first so that the members can index their roles
+        guild_members, guild['members'] = guild['members'], []
+        server = Server(**guild)
+
+        if self.lazy_members:
+            self._add_lazy_members(server, guild, guild_members)
+        else:
+            members = server._members
+            for data in guild_members:
+                member = Member(server=server, **data)
+                members[member.id] = member
+
+            for presence in guild['presences']:
+                member = members.get(presence['user']['id'])
+                if member is not None:
+                    member.status = presence['status']
+                    member.game_id = presence.get('game_id')
+
+        # found the member that owns the server
+        server.owner = server.get_member(guild['owner_id']) or guild['owner_id']
+
+        for channel in guild['channels']:
+            server._add_channel(Channel(server=server, **channel))
+
+        for obj in guild.get('voice_states', []):
+            self._update_voice_state(server, obj)
+        self._add_server_to_index(server)
+        return server
+
+    def _add_lazy_members(self, server, guild, members):
+        # members are stored in a compact form and only turned into a
+        # Member when they are first looked up.
+        presences = {}
+        for presence in guild['presences']:
+            presences[presence['user']['id']] = presence
+
+        role_bits_for = server._role_bits_for
+        make_lazy = LazyMember._make
+        lazy_members = server._lazy_members
+        for data in members:
+            user = data['user']
+            user_id = user['id']
+            status, game_id = 'offline', None
+            presence = presences.get(user_id)
+            if presence is not None:
+                status, game_id = presence['status'], presence.get('game_id')
+
+            lazy_members[user_id] = make_lazy((user['username'], sys.intern(user['discriminator']),
+                                               user['avatar'], data['joined_at'], role_bits_for(data['roles']),
+                                               data['deaf'], data['mute'], status, game_id))
+
+    def handle_ready(self, data):
+        self.user = User(**data['user'])
+        self.session_id = data.get('session_id')
+        guilds = data.get('guilds')
+
+        for guild in guilds:
+            self._add_server(guild)
+
+        for pm in data.get('private_channels'):
+            self._add_private_channel(PrivateChannel(id=pm['id'],
+                                      user=User(**pm['recipient'])))
+
+        # we're all ready
+        self.dispatch('ready')
+
+    def handle_resumed(self, data):
+        # the events missed while disconnected have been replayed
+        self.dispatch('resumed')
+
+    def handle_message_create(self, data):
+        channel = self.get_channel(data.get('channel_id'))
+        message = Message(channel=channel, **data)
+        self.dispatch('message', message)
+        self._messages.add(message)
+
+    def handle_message_delete(self, data):
+        channel = self.get_channel(data.get('channel_id'))
+        message_id = data.get('id')
+        found = self._get_message(message_id)
+        if found is not None:
+            self.dispatch('message_delete', found)
+            self._messages.pop(message_id)
+
+    def handle_message_update(self, data):
+        older_message = self._get_message(data.get('id'))
+        if older_message is not None:
+            # create a shallow copy of the old message, the channel and
+            # author references are shared so this doesn't scale with the
+            # size of the server. Every attribute below is rebound rather
+            # than mutated so the old message is left untouched.
+            message = copy.copy(older_message)
+            # update the new update
+            for attr in data:
+                if attr == 'channel_id' or attr == 'author':
+                    continue
+                value = data[attr]
+                if 'time' in attr:
+                    setattr(message, attr, utils.parse_time(value))
+                elif attr == 'mentions':
+                    message.mentions = [User(**mention) for mention in value]
+                elif attr in Message.__slots__:
+                    setattr(message, attr, value)
+            self.dispatch('message_edit', older_message, message)
+            # update the older message
+            self._messages.replace(message)
+
+    def handle_presence_update(self, data):
+        server = self._get_server(data.get('guild_id'))
+        if server is not None:
+            status = data.get('status')
+            user = data['user']
+            member_id = user['id']
+            member = server.get_member(member_id)
+            if member is not None:
+                member.status = data.get('status')
+                member.game_id = data.get('game_id')
+                member.name = user.get('username', member.name)
+                member.avatar = user.get('avatar', member.avatar)
+
+                # call the event now
+                self.dispatch('status', member)
+                self.dispatch('member_update', member)
+
+    def handle_user_update(self, data):
+        self.user = User(**data)
+
+    def handle_channel_delete(self, data):
+        server =  self._get_server(data.get('guild_id'))
+        if server is not None:
+            channel_id = data.get('id')
+            channel = server.get_channel(channel_id)
+            if channel is not None:
+                self._remove_channel(server, channel)
+                self.dispatch('channel_delete', channel)
+
+    def handle_channel_update(self, data):
+        server = self._get_server(data.get('guild_id'))
+        if server is not None:
+            channel_id = data.get('id')
+            channel = server.get_channel(channel_id)
+            if channel is not None:
+                channel.update(server=server, **data)
+                self.dispatch('channel_update', channel)
+
+    def handle_channel_create(self, data):
+        is_private = data.get('is_private', False)
+        channel = None
+        if is_private:
+            recipient = User(**data.get('recipient'))
+            pm_id = data.get('id')
+            channel = PrivateChannel(id=pm_id, user=recipient)
+            self._add_private_channel(channel)
+        else:
+            server = self._get_server(data.get('guild_id'))
+            if server is not None:
+                channel = Channel(server=server, **data)
+                self._add_channel(server, channel)
+
+        self.dispatch('channel_create', channel)
+
+    def handle_guild_member_add(self, data):
+        server = self._get_server(data.get('guild_id'))
+        member = Member(server=server, deaf=False, mute=False, **data)
+        server._add_member(member)
+        self.dispatch('member_join', member)
+
+    def handle_guild_member_remove(self, data):
+        server = self._get_server(data.get('guild_id'))
+        if server is not None:
+            user_id = data['user']['id']
+            member = server.get_member(user_id)
+            if member is not None:
+                server._remove_member(member)
+                self.dispatch('member_remove', member)
+
+    def handle_guild_member_update(self, data):
+        server = self._get_server(data.get('guild_id'))
+        user_id = data['user']['id']
+        member = server.get_member(user_id)
+        if member is not None:
+            user = data['user']
+            member.name = user['username']
+            member.discriminator = user['discriminator']
+            member.avatar = user['avatar']
+            member.roles = data['roles']
+            self.dispatch('member_update', member)
+
+    def handle_guild_create(self, data):
+        server = self._add_server(data)
+        self.dispatch('server_create', server)
+
+    def handle_guild_delete(self, data):
+        server = self._get_server(data.get('id'))
+        if server is not None:
+            self._remove_server_from_index(server)
+            self.dispatch('server_delete', server)
+
+    def handle_guild_role_create(self, data):
+        server = self._get_server(data.get('guild_id'))
+        role_data = data.get('role', {})
+        everyone = server.id == role_data.get('id')
+        role = server._add_role(Role(everyone=everyone, **role_data))
+        if everyone:
+            server._invalidate_permissions()
+        self.dispatch('server_role_create', server, role)
+
+    def handle_guild_role_delete(self, data):
+        server = self._get_server(data.get('guild_id'))
+        if server is not None:
+            role_id = data.get('role_id')
+            role = utils.find(lambda r: r.id == role_id, server.roles)
+            server._remove_role(role)
+            self.dispatch('server_role_delete', server, role)
+
+    def handle_guild_role_update(self, data):
+        server = self._get_server(data.get('guild_id'))
+        if server is not None:
+            role_id = data['role']['id']
+            role = utils.find(lambda r: r.id == role_id, server.roles)
+            role.update(**data['role'])
+            server._invalidate_permissions()
+            self.dispatch('server_role_update', role)
+
+    def handle_voice_state_update(self, data):
+        server = self._get_server(data.get('guild_id'))
+        if server is not None:
+            updated_member = self._update_voice_state(server, data)
+            self.dispatch('voice_state_update', updated_member)
+
+    def get_channel(self, id):
+        return self._channels.get(id)
@@ -43,6 +43,8 @@ class User(object):
         The avatar hash the user has. Could be None.
     """
 
+    __slots__ = ('name', 'id', 'discriminator', 'avatar')
+
     def __init__(self, username, id, discriminator, avatar, **kwargs):
         self.name = username
         self.id = id
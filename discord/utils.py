@@ -26,13 +26,46 @@ DEALINGS IN THE SOFTWARE.
 
 from re import split as re_split
 import datetime
+import functools
+import random
 
 
+def _parse_time_slow(timestamp):
+    return datetime.datetime(*map(int, re_split(r'[^\d]', timestamp.replace('+00:00', ''))))
+
+# only available on Python 3.7+, where it is implemented in C.
+_fromisoformat = getattr(datetime.datetime, 'fromisoformat', None)
+
+def _parse_time_fast(timestamp):
+    # handles the exact formats the gateway sends, e.g.
+    # 2015-08-21T12:03:45.782000+00:00 or 2015-08-21T12:03:45+00:00
+    # with the offset being optional.
+    if timestamp.endswith('+00:00'):
+        timestamp = timestamp[:-6]
+
+    if len(timestamp) < 19 or timestamp[10] != 'T':
+        raise ValueError('unknown timestamp format')
+
+    result = _fromisoformat(timestamp)
+    if result.tzinfo is not None:
+        raise ValueError('unknown timestamp format')
+    return result
+
 def parse_time(timestamp):
     if timestamp:
-        return datetime.datetime(*map(int, re_split(r'[^\d]', timestamp.replace('+00:00', ''))))
+        if _fromisoformat is not None:
+            try:
+                return _parse_time_fast(timestamp)
+            except ValueError:
+                pass
+        return _parse_time_slow(timestamp)
     return None
 
+# timestamps such as Member.joined_at repeat a lot when a server is loaded
+# so they go through a small cache. datetime objects are immutable so sharing
+# them is fine.
+_parse_time_cached = functools.lru_cache(maxsize=1024)(parse_time)
+
 def find(predicate, seq):
     """A helper to return the first element found in the sequence
     that meets the predicate. For example: ::
@@ -55,3 +88,13 @@ def find(predicate, seq):
         if predicate(element):
             return element
     return None
+
+def _backoff_delay(attempt, base, cap, jitter):
+    """Returns the seconds to wait before the ``attempt``-th reconnect (starting at 1).
+
+    The delay doubles with every attempt up to ``cap``. ``jitter`` is the fraction
+    of the delay, from 0 to 1, that is randomised so that clients that lost their
+    connection at the same time don't retry in lockstep.
+    """
+    delay = min(cap, base * 2 ** min(attempt - 1, 32))
+    return delay * (1 - jitter * random.random())
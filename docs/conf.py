@@ -33,6 +33,14 @@ extensions = [
     'sphinx.ext.autodoc',
 ]
 
+# Substitutions available to every document, the AsyncClient docstrings use
+# |coro| to mark coroutines.
+rst_prolog = """
+.. |coro| replace:: This function is a |corourl|_.
+.. |corourl| replace:: *coroutine*
+.. _corourl: https://docs.python.org/3/library/asyncio-task.html#coroutine
+"""
+
 # Add any paths that contain templates here, relative to this directory.
 templates_path = ['_templates']
 
@@ -26,6 +26,10 @@ setup(name='discord.py',
       long_description=readme,
       include_package_data=True,
       install_requires=requirements,
+      extras_require={
+        'asyncio': ['aiohttp>=3.7'],
+        'speed': ['orjson']
+      },
       classifiers=[
         'Development Status :: 2 - Pre-Alpha',
         'License :: OSI Approved :: MIT License',